@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+End-to-end client benchmarks against heroku3.fakeapi.
+
+Times listings, pagination, hydration and bulk operations through the
+full HerokuCore request path, over a local fake API with a simulated
+network latency::
+
+    $ python benchmarks/bench_api.py --latency 0.005
+
+The client's rate limiter is disabled, the fake API doesn't spend budget.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from heroku3.fakeapi import FakeHerokuAPI  # noqa
+from heroku3.models.release import Release  # noqa
+
+
+def benchmarks(h, app):
+    """Returns (name, callable) pairs, each making the calls of one benchmark."""
+    apps = list(h.apps())[:100]
+    releases_page = h._resource_deserialize(h._http_resource('GET', ('apps', app.id, 'releases'), limit=1000).content)
+
+    return [
+        ('apps()', lambda: h.apps()),
+        ('app.releases()', lambda: app.releases()),
+        ('app.releases(stream)', lambda: sum(1 for _ in app.releases(stream=True))),
+        ('app.releases(prefetch=2)', lambda: sum(1 for _ in app.releases(stream=True, prefetch=2))),
+        ('hydrate 1000 releases', lambda: h._process_items(releases_page, Release)),
+        ('100x dynos, serial', lambda: [a.dynos() for a in apps]),
+        ('100x dynos, map_apps', lambda: h.map_apps(lambda a: a.dynos(), apps)),
+        ('100x config update', lambda: h.map_apps(lambda a: a.update_config({'BENCH': '1'}), apps)),
+        ('100x scale web', lambda: h.map_apps(lambda a: a.scale_formation_process('web', 2), apps)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=1000)
+    parser.add_argument('--releases', type=int, default=5000, help='releases of the benchmarked app')
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds added to every request')
+    parser.add_argument('--payload-size', type=int, default=0, help='bytes of padding per object')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compact', action='store_true', help='build compact models')
+    args = parser.parse_args()
+
+    api = FakeHerokuAPI(apps=args.apps, releases=0, latency=args.latency, payload_size=args.payload_size)
+    with api:
+        h = api.client(rate_limiter=False, compact=args.compact)
+        app = h.apps()[0]
+        with api._lock:
+            state = api._apps[app.id]
+            state['releases'] = [api._release(state['app'], v) for v in range(1, args.releases + 1)]
+
+        print('{0:<28} {1:>10} {2:>10}'.format('benchmark', 'best (s)', 'requests'))
+        for (name, fn) in benchmarks(h, app):
+            before = sum(api.requests.values())
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            requests = (sum(api.requests.values()) - before) // args.repeat
+            print('{0:<28} {1:>10.4f} {2:>10}'.format(name, best, requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+JSON codec micro-benchmark.
+
+Decodes full 1000 item pages of apps and releases with every installed
+codec, against the previous decode-to-str then json.loads path::
+
+    $ python benchmarks/bench_codecs.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_hydration import app_payload, release_payload  # noqa
+from heroku3.compat import CODECS, json  # noqa
+
+PAGE = 1000
+NUMBER = 20
+REPEAT = 5
+
+
+def legacy_loads(b):
+    """The pre-codec implementation of _resource_deserialize."""
+    return json.loads(b.decode('utf-8'))
+
+
+def best(fn, arg):
+    return min(timeit.repeat(lambda: fn(arg), number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def main():
+    codecs = [cls() for cls in CODECS.values() if cls.available]
+    print('{0:<10} {1:<8} {2:>12} {3:>12} {4:>8}'.format('payload', 'codec', 'loads (ms)', 'dumps (ms)', 'speedup'))
+
+    for (name, payload) in (('apps', app_payload), ('releases', release_payload)):
+        page = [payload(i) for i in range(PAGE)]
+        body = json.dumps(page).encode('utf-8')
+
+        baseline = best(legacy_loads, body)
+        print('{0:<10} {1:<8} {2:>12.3f} {3:>12} {4:>7.2f}x'.format(name, 'legacy', baseline * 1000, '-', 1.0))
+
+        for codec in codecs:
+            loads = best(codec.loads, body)
+            dumps = best(codec.dumps, page)
+            print('{0:<10} {1:<8} {2:>12.3f} {3:>12.3f} {4:>7.2f}x'.format(name, codec.name, loads * 1000, dumps * 1000, baseline / loads))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Model hydration micro-benchmark.
+
+Compares the compiled per-class hydrators used by BaseResource.new_from_dict
+with the generic to_python path they replaced, on 10k item listings. Both
+sides parse every date eagerly with dateutil, so neither lazy dates nor the
+parse_date fast path count towards the figure::
+
+    $ python benchmarks/bench_hydration.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dateutil.parser import parse as parse_datetime  # noqa
+
+from heroku3.models.app import App  # noqa
+from heroku3.models.dyno import Dyno  # noqa
+from heroku3.models.release import Release  # noqa
+
+ITEMS = 10000
+REPEAT = 5
+
+
+def release_payload(i):
+    return {
+        'addon_plan_names': ['heroku-postgresql:dev'],
+        'created_at': '2012-01-01T12:00:00Z',
+        'description': 'Deploy 1a2b3c4{0}'.format(i),
+        'id': '01234567-89ab-cdef-0123-{0:012d}'.format(i),
+        'slug': {'id': '01234567-89ab-cdef-0123-456789abcdef'},
+        'status': 'succeeded',
+        'updated_at': '2012-01-01T12:00:00Z',
+        'user': {'email': 'username@example.com', 'id': '01234567-89ab-cdef-0123-456789abcdef'},
+        'version': i,
+        'current': False,
+    }
+
+
+def app_payload(i):
+    return {
+        'archived_at': '2012-01-01T12:00:00Z',
+        'buildpack_provided_description': 'Ruby/Rack',
+        'created_at': '2012-01-01T12:00:00Z',
+        'git_url': 'https://git.heroku.com/example-{0}.git'.format(i),
+        'id': '01234567-89ab-cdef-0123-{0:012d}'.format(i),
+        'maintenance': False,
+        'name': 'example-{0}'.format(i),
+        'owner': {'email': 'username@example.com', 'id': '01234567-89ab-cdef-0123-456789abcdef'},
+        'region': {'id': '01234567-89ab-cdef-0123-456789abcdef', 'name': 'us'},
+        'released_at': '2012-01-01T12:00:00Z',
+        'repo_size': 0,
+        'slug_size': 0,
+        'stack': {'id': '01234567-89ab-cdef-0123-456789abcdef', 'name': 'heroku-18'},
+        'updated_at': '2012-01-01T12:00:00Z',
+        'web_url': 'https://example-{0}.herokuapp.com/'.format(i),
+    }
+
+
+def dyno_payload(i):
+    return {
+        'attach_url': None,
+        'command': 'bundle exec puma',
+        'created_at': '2012-01-01T12:00:00Z',
+        'id': '01234567-89ab-cdef-0123-{0:012d}'.format(i),
+        'name': 'web.{0}'.format(i),
+        'release': {'id': '01234567-89ab-cdef-0123-456789abcdef', 'version': 11},
+        'size': 'standard-1X',
+        'state': 'up',
+        'type': 'web',
+        'updated_at': '2012-01-01T12:00:00Z',
+    }
+
+
+def generic(cls, d):
+    """new_from_dict as it was before compiled hydrators, dates parsed eagerly."""
+    obj = cls()
+    out = dict()
+
+    for k in cls._strs:
+        out[k] = d.get(k)
+
+    for k in cls._dates:
+        value = d.get(k)
+        out[k] = parse_datetime(value) if value is not None else None
+
+    for k in cls._ints:
+        if d.get(k) is not None:
+            out[k] = int(d.get(k))
+
+    for k in cls._bools:
+        if d.get(k) is not None:
+            out[k] = bool(d.get(k))
+
+    for k in cls._dicts:
+        if d.get(k) is not None:
+            out[k] = dict(d.get(k))
+
+    for (k, v) in cls._map.items():
+        if d.get(k):
+            out[k] = generic(v, d.get(k))
+
+    for (k, v) in cls._arrays.items():
+        if d.get(k):
+            out[k] = [generic(v, i) for i in d.get(k)]
+
+    out['_in_dict'] = d
+
+    obj.__dict__.update(out)
+    obj.__dict__.update(_h=None)
+
+    return obj
+
+
+def compiled(cls, d):
+    """new_from_dict, with the lazy dates of the object tree parsed as generic() does."""
+    return parse_dates(cls.new_from_dict(d))
+
+
+def parse_dates(obj):
+    for k in obj._dates:
+        value = obj.__dict__.get(k)
+        if value is not None:
+            obj.__dict__[k] = parse_datetime(value)
+
+    for k in obj._map:
+        if obj.__dict__.get(k) is not None:
+            parse_dates(obj.__dict__[k])
+
+    for k in obj._arrays:
+        for i in obj.__dict__.get(k) or ():
+            parse_dates(i)
+
+    return obj
+
+
+def main():
+    print('{0:<10} {1:>12} {2:>12} {3:>8}'.format('model', 'generic (s)', 'compiled (s)', 'speedup'))
+    for (cls, payload) in ((Release, release_payload), (App, app_payload), (Dyno, dyno_payload)):
+        items = [payload(i) for i in range(ITEMS)]
+
+        before = min(timeit.repeat(lambda: [generic(cls, d) for d in items], number=1, repeat=REPEAT))
+        after = min(timeit.repeat(lambda: [compiled(cls, d) for d in items], number=1, repeat=REPEAT))
+
+        print('{0:<10} {1:>12.4f} {2:>12.4f} {3:>7.2f}x'.format(cls.__name__, before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
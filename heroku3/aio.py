@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.aio
+~~~~~~~~~~
+
+This module provides an asyncio interface for Heroku, built on aiohttp.
+
+HerokuAsync offers the same surface as :class:`heroku3.api.Heroku`. Every
+method that talks to the API is a coroutine, and so are the model methods
+(``App.dynos``, ``App.releases``, ``Formation.scale``, ...) of the objects it
+returns, since they go through the client's transport::
+
+    h = await heroku3.aio.from_key('YOUR_API_KEY')
+    app = await h.app('sharp-night-7758')
+    dynos = await app.dynos()
+    await h.close()
+
+Helpers which chain several requests in Python, or run their own threads,
+remain synchronous only and raise TypeError here: ``App.restart``,
+``App.rollback``, ``App.deploy_tarball``, ``App.deploy_directory``,
+``Key.delete``, ``ConfigVars`` item assignment, ``update``, ``commit`` and
+``apply``, ``Heroku.stream_logs`` and ``Heroku.run_command_on_apps``.
+"""
+
+from functools import partial
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+
+from .api import Heroku, DEFAULT_HEADERS, DEFAULT_WORKERS
+from .helpers import is_collection
+from .models.app import App
+from .models.dyno import Dyno
+from .models.logsession import parse_logline
+from .rendezvous import AsyncRendezvous
+
+
+async def read_ahead(aiterable, depth):
+    """Iterates over aiterable from a background task, keeping up to depth items ready."""
+
+    ready = asyncio.Queue(maxsize=depth)
+    exhausted = object()
+
+    async def produce():
+        try:
+            async for item in aiterable:
+                await ready.put((item, None))
+        except Exception as e:
+            await ready.put((exhausted, e))
+        else:
+            await ready.put((exhausted, None))
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item, error = await ready.get()
+            if item is exhausted:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        task.cancel()
+
+
+class AsyncResponse(object):
+    """A requests-like view over a fully read aiohttp response."""
+
+    def __init__(self, method, url, status, reason, headers, content):
+        self.method = method
+        self.url = url
+        self.status_code = status
+        self.reason = reason
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+
+    def __repr__(self):
+        return '<AsyncResponse [%s]>' % (self.status_code)
+
+    @property
+    def ok(self):
+        try:
+            self.raise_for_status()
+        except HTTPError:
+            return False
+        return True
+
+    def raise_for_status(self):
+        """Raises HTTPError for 4xx and 5xx responses, like requests does."""
+
+        if 400 <= self.status_code < 500:
+            kind = 'Client Error'
+        elif 500 <= self.status_code < 600:
+            kind = 'Server Error'
+        else:
+            return
+
+        raise HTTPError('%s %s: %s for url: %s' % (self.status_code, kind, self.reason, self.url), response=self)
+
+
+class HerokuAsync(Heroku):
+    """The asyncio Heroku class."""
+
+    def __init__(self, session=None, connection_limit=100, **kwargs):
+        if aiohttp is None:
+            raise ImportError('HerokuAsync requires aiohttp, install it with `pip install heroku3[async]`')
+
+        self._auth = None
+        self._connection_limit = connection_limit
+        super(HerokuAsync, self).__init__(session=session, **kwargs)
+
+    def __repr__(self):
+        return '<heroku-async-client at 0x%x>' % (id(self))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @staticmethod
+    def _new_session():
+        # aiohttp sessions must be created from within the event loop.
+        return None
+
+    @staticmethod
+    def _configure_session(session):
+        if session is not None:
+            session.headers.update(DEFAULT_HEADERS)
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=DEFAULT_HEADERS,
+                connector=aiohttp.TCPConnector(limit=self._connection_limit)
+            )
+        return self._session
+
+    async def close(self):
+        """Closes the underlying aiohttp session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def authenticate(self, api_key):
+        """Logs user into Heroku with given api_key."""
+        self._api_key = api_key
+        self._auth = aiohttp.BasicAuth('', self._api_key)
+
+        return await self._verify_api_key()
+
+    @property
+    def is_authenticated(self):
+        return bool(self._api_key_verified)
+
+    async def _verify_api_key(self):
+        session = self._get_session()
+        async with session.get(self._url_for('account/rate-limits'), auth=self._auth) as r:
+            self._api_key_verified = True if r.status < 400 else False
+
+        return self._api_key_verified
+
+    async def _http_resource(self, method, resource, params=None, data=None, legacy=False, order_by=None, limit=None, valrange=None, sort=None, page=None):
+        """Makes an HTTP request."""
+
+        if not is_collection(resource):
+            resource = [resource]
+
+        url = self._url_for(*resource)
+
+        headers = self._get_headers_for_request(method, url, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort)
+
+        if params:
+            # aiohttp only accepts strings as query values.
+            params = dict((k, str(v)) for (k, v) in params.items())
+
+        cached = self._prepare_conditional(method, url, params, headers)
+        event = self._start_event(method, resource, url, headers, page)
+
+        session = self._get_session()
+        attempt = 0
+        while True:
+            delay = self._reserve_request()
+            if delay:
+                await asyncio.sleep(delay)
+                self._add_wait(event, delay)
+
+            self._emit_attempt(event, attempt)
+            sent = time.perf_counter()
+            try:
+                async with session.request(method, url, params=params, data=data, headers=headers, auth=self._auth) as resp:
+                    ttfb = time.perf_counter() - sent
+                    content = await resp.read()
+                    r = AsyncResponse(method, str(resp.url), resp.status, resp.reason, resp.headers, content)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = self._retry_delay(method, attempt, error=e)
+                if delay is None:
+                    self._finish_event(event, error=e)
+                    raise
+            else:
+                delay = self._retry_delay(method, attempt, r=r)
+                if delay is None:
+                    resolved = self._resolve_conditional(cached, r)
+                    self._finish_event(event, r=resolved, raw=r, ttfb=ttfb)
+                    return self._handle_response(resolved)
+
+            await asyncio.sleep(delay)
+            self._add_wait(event, delay)
+            attempt += 1
+
+    def _enable_timing(self):
+        # aiohttp has no pooled requests adapter to swap, connect times are not reported.
+        pass
+
+    @staticmethod
+    def _cached_response(entry, r):
+        """Builds a response from a cache entry, for the request of 304 response r."""
+        reason = 'OK' if entry.status_code == 200 else 'Partial Content'
+        return AsyncResponse(r.method, r.url, entry.status_code, reason, entry.headers, entry.content)
+
+    async def _request_item(self, method, resource, obj, params=None, data=None, legacy=False, **kwargs):
+        """Makes an HTTP request and returns the mapped object from its body."""
+        r = await self._http_resource(method, resource, params=params, data=data, legacy=legacy)
+        r.raise_for_status()
+
+        return self._process_item(self._resource_deserialize(r.content), obj, **kwargs)
+
+    async def _request_items(self, method, resource, obj, params=None, data=None, map=None, **kwargs):
+        """Makes an HTTP request and returns the mapped list of objects from its body."""
+        r = await self._http_resource(method, resource, params=params, data=data)
+        r.raise_for_status()
+
+        return self._process_items(self._resource_deserialize(r.content), obj, map=map, **kwargs)
+
+    async def _request_data(self, method, resource, params=None, data=None, legacy=False):
+        """Makes an HTTP request and returns its decoded body."""
+        r = await self._http_resource(method, resource, params=params, data=data, legacy=legacy)
+        r.raise_for_status()
+
+        return self._resource_deserialize(r.content)
+
+    async def _request_ok(self, method, resource, params=None, data=None, legacy=False):
+        """Makes an HTTP request and returns whether it succeeded."""
+        r = await self._http_resource(method, resource, params=params, data=data, legacy=legacy)
+        r.raise_for_status()
+
+        return r.ok
+
+    async def _get_resource(self, resource, obj, params=None, **kwargs):
+        """Returns a mapped object from an HTTP resource."""
+        r = await self._http_resource('GET', resource, params=params)
+
+        return self._process_item(self._resource_deserialize(r.content), obj, **kwargs)
+
+    def _get_resources(self, resource, obj, params=None, map=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, stream=False, prefetch=0, **kwargs):
+        """Returns a list of mapped objects from an HTTP resource.
+
+        The list is returned by a coroutine. With stream=True, returns an
+        async iterator which fetches and maps one Range page at a time.
+        With prefetch=N, up to N following pages are fetched by a
+        background task while the current one is being processed.
+        """
+        if not order_by:
+            order_by = obj.order_by
+
+        if stream:
+            pages = self._iter_pages(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, prefetch=prefetch)
+            return self._iter_items(pages, obj, **kwargs)
+
+        return self._get_list(resource, obj, params=params, map=map, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, prefetch=prefetch, **kwargs)
+
+    async def _get_list(self, resource, obj, params=None, map=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, prefetch=0, **kwargs):
+        items = await self._get_data(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, prefetch=prefetch)
+
+        return self._process_items(items, obj, map=map, **kwargs)
+
+    async def _get_data(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, prefetch=0):
+
+        items = []
+        async for page in self._iter_pages(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, prefetch=prefetch):
+            if not isinstance(page, list):
+                return page
+            items.extend(page)
+
+        return items
+
+    def _iter_pages(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, prefetch=0):
+        """Yields the decoded pages of a listing, following Next-Range headers."""
+
+        pages = self._walk_pages(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort)
+        if prefetch:
+            pages = read_ahead(pages, prefetch)
+
+        return pages
+
+    async def _walk_pages(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None):
+
+        page = 1
+        r = await self._http_resource('GET', resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, page=page)
+        yield self._resource_deserialize(r.content)
+
+        while r.status_code == 206 and 'Next-Range' in r.headers and not limit:
+            page += 1
+            r = await self._http_resource('GET', resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=r.headers['Next-Range'], sort=sort, page=page)
+            yield self._resource_deserialize(r.content)
+
+    async def _iter_items(self, pages, obj, **kwargs):
+        """Yields mapped objects from decoded pages, page by page."""
+        async for page in pages:
+            if isinstance(page, dict):
+                page = [page]
+            for item in page:
+                yield self._process_item(item, obj, **kwargs)
+
+    async def gather(self, calls, workers=DEFAULT_WORKERS, return_exceptions=True):
+        """Runs the given coroutine functions concurrently, at most workers at a time.
+
+        Returns their results in input order. A call that raises leaves its
+        exception in its slot, unless return_exceptions is False.
+        """
+        semaphore = asyncio.Semaphore(workers)
+
+        async def run(call):
+            async with semaphore:
+                return await call()
+
+        return await asyncio.gather(*[run(call) for call in calls], return_exceptions=return_exceptions)
+
+    async def map_apps(self, fn, apps, workers=DEFAULT_WORKERS, return_exceptions=True):
+        """Awaits fn(app) for every app concurrently, see gather."""
+        return await self.gather([partial(fn, app) for app in apps], workers=workers, return_exceptions=return_exceptions)
+
+    async def update_formations(self, updates, workers=DEFAULT_WORKERS):
+        """Applies {app_id_or_name: updates} concurrently, one request per app."""
+        apps = list(updates)
+        results = await self.gather([partial(self.update_formation, app, updates[app]) for app in apps], workers=workers)
+
+        return dict(zip(apps, results))
+
+    async def create_app(self, name=None, stack_id_or_name='cedar', region_id_or_name=None):
+        """Creates a new app."""
+
+        payload = {}
+
+        if name:
+            payload['name'] = name
+
+        if stack_id_or_name:
+            payload['stack'] = stack_id_or_name
+
+        if region_id_or_name:
+            payload['region'] = region_id_or_name
+
+        try:
+            app = await self._request_item(
+                method='POST',
+                resource=('apps',),
+                obj=App,
+                data=self._resource_serialize(payload)
+            )
+        except HTTPError as e:
+            if "Name is already taken" in str(e):
+                print("Warning - {0:s}".format(str(e)))
+                app = await self.app(name)
+            else:
+                raise e
+        return app
+
+    async def _run_command(self, app_id_or_name, command, size=1, attach=True, printout=True, env=None, stream=False, **kwargs):
+        if attach:
+            attach = True
+        payload = {'command': command, 'attach': attach, 'size': size}
+
+        if env:
+            payload['env'] = env
+
+        dyno = await self._request_item(
+            method='POST',
+            resource=('apps', app_id_or_name, 'dynos'),
+            obj=Dyno,
+            data=self._resource_serialize(payload),
+            **kwargs
+        )
+
+        if attach:
+            rendezvous = AsyncRendezvous(dyno.attach_url, printout)
+            if stream:
+                return rendezvous, dyno
+            output = await rendezvous.start()
+            return output, dyno
+        else:
+            return dyno
+
+    async def ratelimit_remaining(self):
+
+        if self._ratelimit_remaining is None:
+            await self.rate_limit
+        return int(self._ratelimit_remaining)
+
+    def _require_sync(self, name):
+        raise TypeError('{0} is synchronous only, use heroku3.api.Heroku for it'.format(name))
+
+    def stream_logs(self, *args, **kwargs):
+        self._require_sync('Heroku.stream_logs')
+
+    def run_command_on_apps(self, *args, **kwargs):
+        self._require_sync('Heroku.run_command_on_apps')
+
+    async def stream_app_log(self, app_id_or_name, dyno=None, lines=100, source=None, timeout=False, parse=False):
+        logger = await self._app_logger(app_id_or_name, dyno=dyno, lines=lines, source=source, tail=True)
+
+        return self._iter_log(logger.logplex_url, timeout=timeout, parse=parse)
+
+    async def get_app_log(self, app_id_or_name, dyno=None, lines=100, source=None, timeout=False, parse=False):
+        logger = await self._app_logger(app_id_or_name, dyno=dyno, lines=lines, source=source, tail=0)
+
+        session = self._get_session()
+        async with session.get(logger.logplex_url, timeout=self._log_timeout(timeout)) as r:
+            content = (await r.read()).decode("utf-8")
+
+        if not parse:
+            return content
+        return [parse_logline(line) for line in content.splitlines() if line]
+
+    async def _iter_log(self, url, timeout=False, parse=False):
+        session = self._get_session()
+        async with session.get(url, timeout=self._log_timeout(timeout)) as r:
+            async for line in r.content:
+                line = line.rstrip(b'\r\n')
+                if not parse:
+                    yield line
+                elif line:
+                    yield parse_logline(line)
+
+    @staticmethod
+    def _log_timeout(timeout):
+        return aiohttp.ClientTimeout(total=timeout or None)
+
+
+async def from_key(api_key, session=None, **kwargs):
+    """Returns an authenticated HerokuAsync instance, via API Key."""
+    h = HerokuAsync(session=session, **kwargs)
+
+    # Login.
+    await h.authenticate(api_key)
+
+    return h
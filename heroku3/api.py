@@ -7,27 +7,38 @@ heroku3.api
 This module provides the basic API interface for Heroku.
 """
 
-from .compat import json
-from .helpers import is_collection
+from .compat import get_codec
+from .cache import DiskCache, ResponseCache
+from .helpers import is_collection, read_ahead
+from .logstream import LogStream
+from .instrumentation import HOOK_EVENTS, RequestEvent, TimingAdapter, pop_connect_time, template_path
 from .models import Plan, RateLimit
 from .models.app import App
 from .models.addon import Addon
 from .models.dyno import Dyno
+from .models.formation import Formation, formation_updates
 from .models.account import Account
 from .models.key import Key
 from .models.invoice import Invoice
 from .models.configvars import ConfigVars
 from .models.logsession import LogSession
 from .models.oauth import OAuthClient, OAuthAuthorization, OAuthToken
-from .rendezvous import Rendezvous
+from .ratelimit import TokenBucket
+from .retry import RetryPolicy
+from .rendezvous import Rendezvous, RendezvousMultiplexer
 from .structures import KeyedListResource, SSHKeyListResource
 from .models.account.feature import AccountFeature
 from requests.exceptions import HTTPError
 from pprint import pprint # noqa
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 import requests
 from urllib.request import Request, urlopen
 from urllib.parse import urlencode
 import sys
+import time
 
 if sys.version_info > (3, 0):
     from urllib.parse import quote
@@ -37,6 +48,8 @@ else:
 
 HEROKU_URL = 'https://api.heroku.com'
 HEROKU_ALPHA_URL = 'https://kolkrabbi.herokuapp.com'
+DEFAULT_WORKERS = 8
+DEFAULT_HEADERS = {'Accept': 'application/vnd.heroku+json; version=3', 'Content-Type': 'application/json'}
 
 
 class RateLimitExceeded(Exception):
@@ -47,12 +60,32 @@ class MaxRangeExceeded(Exception):
     pass
 
 
+def _strip_auth(r):
+    """requests auth hook which overrides the session's credentials with none."""
+    r.headers.pop('Authorization', None)
+    return r
+
+
 class HerokuCore(object):
     """The core Heroku class."""
-    def __init__(self, session=None):
+    def __init__(self, session=None, rate_limiter=True, retry=True, compact=False, keep_raw=True, cache=False, disk_cache=None, codec=None):
         super(HerokuCore, self).__init__()
         if session is None:
-            session = requests.session()
+            session = self._new_session()
+
+        if rate_limiter is True:
+            rate_limiter = TokenBucket()
+
+        if retry is True:
+            retry = RetryPolicy()
+
+        if cache is True:
+            cache = ResponseCache()
+        elif cache is False:
+            cache = None
+
+        if isinstance(disk_cache, str):
+            disk_cache = DiskCache(disk_cache)
 
         #: The User's API Key.
         self._api_key = None
@@ -61,14 +94,37 @@ class HerokuCore(object):
         self._session = session
         self._ratelimit_remaining = None
         self._last_request_id = None
-
-        # We only want JSON back.
-        #self._session.headers.update({'Accept': 'application/json'})
-        self._session.headers.update({'Accept': 'application/vnd.heroku+json; version=3', 'Content-Type': 'application/json'})
+        #: Paces outgoing requests, pass rate_limiter=False to disable.
+        self._rate_limiter = rate_limiter or None
+        #: Retries 429s, 5xxs and dropped connections, pass retry=False to disable.
+        self._retry = retry or None
+        #: Build models as compact __slots__ classes, optionally without their raw API dict.
+        self._compact = compact
+        self._keep_raw = keep_raw
+        #: Revalidates GETs by ETag and serves 304s from memory, pass cache=True to enable.
+        self._cache = cache
+        #: Keeps releases, slugs and finished builds on disk, pass a directory to enable.
+        self._disk_cache = disk_cache
+        #: Encodes and decodes JSON bodies, the fastest installed parser unless given.
+        self._codec = get_codec(codec)
+        #: Callbacks by hook event, see add_hook.
+        self._hooks = dict((event, []) for event in HOOK_EVENTS)
+
+        self._configure_session(self._session)
 
     def __repr__(self):
         return '<heroku-core at 0x%x>' % (id(self))
 
+    @staticmethod
+    def _new_session():
+        return requests.session()
+
+    @staticmethod
+    def _configure_session(session):
+        # We only want JSON back.
+        #session.headers.update({'Accept': 'application/json'})
+        session.headers.update(DEFAULT_HEADERS)
+
     def authenticate(self, api_key):
         """Logs user into Heroku with given api_key."""
         self._api_key = api_key
@@ -96,17 +152,15 @@ class HerokuCore(object):
         args = list(map(str, args))
         return '/'.join([self._heroku_url] + list(args))
 
-    @staticmethod
-    def _resource_serialize(o):
-        """Returns JSON serialization of given object."""
-        return json.dumps(o)
+    def _resource_serialize(self, o):
+        """Returns JSON serialization of given object, as bytes."""
+        return self._codec.dumps(o)
 
-    @staticmethod
-    def _resource_deserialize(s):
-        """Returns dict deserialization of a given JSON string."""
+    def _resource_deserialize(self, s):
+        """Returns dict deserialization of a given JSON bytes or string."""
 
         try:
-            return json.loads(s)
+            return self._codec.loads(s)
         except ValueError:
             raise ResponseError('The API Response was not valid.')
 
@@ -139,7 +193,22 @@ class HerokuCore(object):
 
         return headers
 
-    def _http_resource(self, method, resource, params=None, data=None, legacy=False, order_by=None, limit=None, valrange=None, sort=None):
+    def _require_sync(self, name):
+        """Called by helpers which chain several requests in Python, the async client refuses them."""
+        pass
+
+    def _external_request(self, method, url, headers=None, **kwargs):
+        """Makes a request to a URL handed out by the API, e.g. a logplex or source blob URL.
+
+        It goes through the client's session and connection pools, without
+        the API credentials and JSON headers.
+        """
+        merged = {'Accept': None, 'Content-Type': None}
+        merged.update(headers or {})
+
+        return self._session.request(method, url, headers=merged, auth=_strip_auth, **kwargs)
+
+    def _http_resource(self, method, resource, params=None, data=None, legacy=False, order_by=None, limit=None, valrange=None, sort=None, page=None):
         """Makes an HTTP request."""
 
         if not is_collection(resource):
@@ -148,17 +217,210 @@ class HerokuCore(object):
         url = self._url_for(*resource)
 
         headers = self._get_headers_for_request(method, url, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort)
+        cached = self._prepare_conditional(method, url, params, headers)
+        event = self._start_event(method, resource, url, headers, page)
 
         #print "\n\n\n\n"
         #print url
-        r = self._session.request(method, url, params=params, data=data, headers=headers)
+        attempt = 0
+        while True:
+            delay = self._reserve_request()
+            if delay:
+                time.sleep(delay)
+                self._add_wait(event, delay)
+
+            self._emit_attempt(event, attempt)
+            try:
+                r = self._session.request(method, url, params=params, data=data, headers=headers)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = self._retry_delay(method, attempt, error=e)
+                if delay is None:
+                    self._finish_event(event, error=e, connect=pop_connect_time())
+                    raise
+            else:
+                delay = self._retry_delay(method, attempt, r=r)
+                if delay is None:
+                    resolved = self._resolve_conditional(cached, r)
+                    if event is not None:
+                        self._finish_event(event, r=resolved, raw=r, ttfb=r.elapsed.total_seconds(), connect=pop_connect_time())
+                    return self._handle_response(resolved)
+
+            time.sleep(delay)
+            self._add_wait(event, delay)
+            attempt += 1
+
+    def add_hook(self, event, callback):
+        """Registers callback(RequestEvent) for a hook event.
+
+        'pre_request' hooks run before every attempt of a request, 'response'
+        hooks once it is done, retries included, whether it succeeded or not.
+        """
+        if event not in self._hooks:
+            raise ValueError("Unknown hook event '{0}', expected one of {1}".format(event, ', '.join(HOOK_EVENTS)))
+
+        self._enable_timing()
+        self._hooks[event].append(callback)
+
+    def remove_hook(self, event, callback):
+        self._hooks[event].remove(callback)
+
+    def _enable_timing(self):
+        """Swaps in an adapter that times new connections, keeping its pool size."""
+        adapter = self._session.get_adapter(self._heroku_url)
+        if type(adapter) is HTTPAdapter:
+            self._session.mount(self._heroku_url, TimingAdapter(pool_maxsize=adapter._pool_maxsize, max_retries=adapter.max_retries))
+
+    def _emit(self, hook, event):
+        for callback in self._hooks[hook]:
+            try:
+                callback(event)
+            except Exception as e:
+                print("Warning, the '{0}' hook {1} raised {2!r}".format(hook, callback, e))
+
+    def _start_event(self, method, resource, url, headers, page):
+        """Returns the RequestEvent of a request about to be sent, or None when nothing listens."""
+        if not (self._hooks['pre_request'] or self._hooks['response']):
+            return None
+
+        event = RequestEvent(method, template_path(resource), url, page=page, range=headers.get('Range'))
+        event.ratelimit_remaining = self._ratelimit_remaining
+
+        return event
+
+    @staticmethod
+    def _add_wait(event, delay):
+        if event is not None:
+            event.wait += delay
+
+    def _emit_attempt(self, event, attempt):
+        if event is not None:
+            event.retries = attempt
+            self._emit('pre_request', event)
+        # Forget connections made outside of this attempt.
+        pop_connect_time()
+
+    def _finish_event(self, event, r=None, raw=None, error=None, ttfb=None, connect=None):
+        """Completes a RequestEvent from the final response or error, and emits it."""
+        if event is None:
+            return
+
+        event.total = time.perf_counter() - event._started
+        event.ttfb = ttfb
+        event.connect = connect
+        event.error = error
+
+        if r is not None:
+            event.status = r.status_code
+            event.bytes = len(raw.content)
+            event.cached = r is not raw
+            event.request_id = r.headers.get('Request-Id')
+
+            before = event.ratelimit_remaining
+            event.ratelimit_remaining = r.headers.get('ratelimit-remaining', self._ratelimit_remaining)
+            if before is not None and event.ratelimit_remaining is not None:
+                event.ratelimit_delta = int(event.ratelimit_remaining) - int(before)
+
+        self._emit('response', event)
+
+    def _prepare_conditional(self, method, url, params, headers):
+        """Adds If-None-Match to a cacheable request, returning its cache key and entry."""
+        if self._cache is None or method != 'GET':
+            return None
+
+        key = self._cache.key(url, params, headers)
+        entry = self._cache.get(key)
+        if entry is not None:
+            headers['If-None-Match'] = entry.etag
+
+        return key, entry
+
+    def _resolve_conditional(self, cached, r):
+        """Stores a fresh response, or swaps a 304 for the cached one."""
+        if cached is None:
+            return r
+
+        key, entry = cached
+        if r.status_code == 304:
+            if entry is None:
+                return r
+            # The 304 carries the current rate limit, the cached headers don't.
+            self._record_response(r)
+            return self._cached_response(entry, r)
+
+        if r.status_code in (200, 206):
+            self._cache.store(key, r)
+
+        return r
+
+    @staticmethod
+    def _cached_response(entry, r):
+        """Builds a response from a cache entry, for the request of 304 response r."""
+        cached = requests.Response()
+        cached.status_code = entry.status_code
+        cached.headers = CaseInsensitiveDict(entry.headers)
+        cached._content = entry.content
+        cached.encoding = r.encoding
+        cached.reason = 'OK' if entry.status_code == 200 else 'Partial Content'
+        cached.url = r.url
+        cached.request = r.request
+        cached.elapsed = r.elapsed
+
+        return cached
+
+    def _reserve_request(self):
+        """Returns how long to wait before the next request fits the rate limit."""
+        if self._rate_limiter is None:
+            return 0
+
+        return self._rate_limiter.reserve()
+
+    def _retry_delay(self, method, attempt, r=None, error=None):
+        """Returns how long to wait before retrying a failed request, or None to give up."""
+        if self._retry is None:
+            return None
+
+        if r is None:
+            status_code = None
+        else:
+            self._record_response(r)
+            status_code = r.status_code
+
+        if not self._retry.should_retry(method, attempt, status_code=status_code, error=error):
+            return None
+
+        retry_after = None
+        if r is not None:
+            retry_after = self._retry.parse_retry_after(r.headers.get('Retry-After'))
+
+        return self._retry.backoff(attempt, retry_after=retry_after)
+
+    @property
+    def ratelimit_budget(self):
+        """The number of requests the rate limiter lets through without waiting."""
+        if self._rate_limiter is None:
+            return None
+
+        return self._rate_limiter.remaining
+
+    def _record_response(self, r):
+        """Records the rate limit and request id of a response."""
 
         if 'ratelimit-remaining' in r.headers:
             self._ratelimit_remaining = r.headers['ratelimit-remaining']
+            if self._rate_limiter is not None:
+                self._rate_limiter.update(int(self._ratelimit_remaining))
 
         if 'Request-Id' in r.headers:
             self._last_request_id = r.headers['Request-Id']
 
+        if r.status_code == 429 and self._rate_limiter is not None:
+            self._rate_limiter.update(0)
+
+    def _handle_response(self, r):
+        """Records the response metadata and raises for API errors."""
+
+        self._record_response(r)
+
         #if 'Accept-Ranges' in r.headers:
             #print "Accept-Ranges = {0}".format(r.headers['Accept-Ranges'])
 
@@ -179,37 +441,236 @@ class HerokuCore(object):
         #print "\n\n\n\n"
         return r
 
+    def _request_item(self, method, resource, obj, params=None, data=None, legacy=False, **kwargs):
+        """Makes an HTTP request and returns the mapped object from its body."""
+        r = self._http_resource(method, resource, params=params, data=data, legacy=legacy)
+        r.raise_for_status()
+
+        return self._process_item(self._resource_deserialize(r.content), obj, **kwargs)
+
+    def _request_items(self, method, resource, obj, params=None, data=None, map=None, **kwargs):
+        """Makes an HTTP request and returns the mapped list of objects from its body."""
+        r = self._http_resource(method, resource, params=params, data=data)
+        r.raise_for_status()
+
+        return self._process_items(self._resource_deserialize(r.content), obj, map=map, **kwargs)
+
+    def _request_data(self, method, resource, params=None, data=None, legacy=False):
+        """Makes an HTTP request and returns its decoded body."""
+        r = self._http_resource(method, resource, params=params, data=data, legacy=legacy)
+        r.raise_for_status()
+
+        return self._resource_deserialize(r.content)
+
+    def _request_ok(self, method, resource, params=None, data=None, legacy=False):
+        """Makes an HTTP request and returns whether it succeeded."""
+        r = self._http_resource(method, resource, params=params, data=data, legacy=legacy)
+        r.raise_for_status()
+
+        return r.ok
+
     def _get_resource(self, resource, obj, params=None, **kwargs):
         """Returns a mapped object from an HTTP resource."""
+        namespace = None if params else self._disk_namespace(resource[:-1], obj, kwargs)
+        if namespace is not None:
+            item = self._disk_cache.get(namespace, resource[-1])
+            if item is not None:
+                return self._process_item(item, obj, **kwargs)
+
         r = self._http_resource('GET', resource, params=params)
+        item = self._resource_deserialize(r.content)
 
-        return self._process_item(self._resource_deserialize(r.content.decode("utf-8")), obj, **kwargs)
+        if namespace is not None and isinstance(item, dict) and obj.is_immutable(item):
+            keys = set([resource[-1], item.get('id') or resource[-1]])
+            self._disk_cache.update(namespace, dict((key, item) for key in keys))
+
+        return self._process_item(item, obj, **kwargs)
+
+    def _disk_namespace(self, resource, obj, kwargs):
+        """Returns the disk cache namespace of a collection of immutable objects, or None.
+
+        Namespaces are keyed by app id rather than by the name in the URL,
+        since app names can be changed and reused.
+        """
+        if self._disk_cache is None or not is_collection(resource) or resource[0] != 'apps':
+            return None
+        if not getattr(obj, '_immutable', False):
+            return None
+
+        # Nested models, such as a Build's result, reach their App through their parents.
+        app = kwargs.get('app')
+        while app is not None and not isinstance(app, App):
+            app = getattr(app, 'app', None)
+
+        if app is None or not app.id or str(resource[1]) not in (app.id, app.name):
+            return None
+
+        return '/'.join([app.id] + [str(part) for part in resource[2:]])
 
     def _process_item(self, item, obj, **kwargs):
 
-        return obj.new_from_dict(item, h=self, **kwargs)
+        return self._model_class(obj).new_from_dict(item, h=self, **kwargs)
+
+    def _model_class(self, obj):
+        """Returns the class that API dicts for obj are built into."""
+        if self._compact and hasattr(obj, 'compact_class'):
+            return obj.compact_class(keep_raw=self._keep_raw)
+
+        return obj
+
+    def _get_resources(self, resource, obj, params=None, map=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, stream=False, prefetch=0, **kwargs):
+        """Returns a list of mapped objects from an HTTP resource.
+
+        With stream=True, returns an iterator which fetches and maps the
+        objects one Range page at a time instead. With prefetch=N, up to N
+        following pages are fetched in the background while the current
+        one is being processed.
+        """
+        namespace = None
+        if not (order_by or params or legacy or limit or valrange or sort):
+            namespace = self._disk_namespace(resource, obj, kwargs)
 
-    def _get_resources(self, resource, obj, params=None, map=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, **kwargs):
-        """Returns a list of mapped objects from an HTTP resource."""
         if not order_by:
             order_by = obj.order_by
 
-        return self._process_items(self._get_data(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort), obj, map=map, **kwargs)
+        if namespace is not None:
+            pages = self._disk_pages(namespace, resource, obj, prefetch=prefetch)
+        else:
+            pages = self._iter_pages(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, prefetch=prefetch)
 
-    def _get_data(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None):
+        if stream:
+            return self._iter_items(pages, obj, **kwargs)
 
-        r = self._http_resource('GET', resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort)
+        return self._process_items(self._join_pages(pages), obj, map=map, **kwargs)
 
-        items = self._resource_deserialize(r.content.decode("utf-8"))
-        if r.status_code == 206 and 'Next-Range' in r.headers and not limit:
-            #We have unexpected chunked response - deal with it
-            valrange = r.headers['Next-Range']
-            print("Warning Response was chunked, Loading the next Chunk using the following next-range header returned by Heroku '{0}'. WARNING - This breaks randomly depending on your order_by name. I think it's only guarenteed to work with id's - Looks to be a Heroku problem".format(valrange))
-            new_items = self._get_data(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort)
-            items.extend(new_items)
+    def _get_data(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, prefetch=0):
+
+        return self._join_pages(self._iter_pages(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, prefetch=prefetch))
+
+    @staticmethod
+    def _join_pages(pages):
+        """Concatenates decoded pages, returning a non-list first page as is."""
+        items = []
+        for page in pages:
+            if not isinstance(page, list):
+                return page
+            items.extend(page)
 
         return items
 
+    def _disk_pages(self, namespace, resource, obj, prefetch=0):
+        """Yields the cached items of a listing, then the pages the cache lacks.
+
+        When the listing is ordered by a number, such as release versions,
+        only the range above the highest cached value is fetched. Fetched
+        items are cached up to the first one which may still change, so
+        that the cached part of the listing stays contiguous, in a single
+        write when the walk ends or is abandoned.
+        """
+        order_by = obj.order_by
+        cached = list(self._disk_cache.items(namespace).values())
+
+        # Without a numeric order there is no telling which items are new.
+        incremental = order_by in obj._ints
+
+        valrange = None
+        if cached and incremental:
+            cached.sort(key=lambda item: item[order_by])
+            valrange = '{0} ]{1}..'.format(order_by, cached[-1][order_by])
+            yield cached
+
+        # Written once the walk ends, rewriting the namespace per page is quadratic.
+        fresh = {}
+        settled = True
+        try:
+            for page in self._iter_pages(resource, order_by=order_by, valrange=valrange, prefetch=prefetch):
+                if not isinstance(page, list):
+                    yield page
+                    return
+
+                for item in page:
+                    immutable = obj.is_immutable(item)
+                    if incremental:
+                        settled = settled and immutable
+                        immutable = settled
+                    if immutable:
+                        fresh[item.get('id') or item[order_by]] = item
+
+                yield page
+        finally:
+            self._disk_cache.update(namespace, fresh)
+
+    def _iter_pages(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None, prefetch=0):
+        """Yields the decoded pages of a listing, following Next-Range headers."""
+
+        pages = self._walk_pages(resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort)
+        if prefetch:
+            pages = read_ahead(pages, prefetch)
+
+        return pages
+
+    def _walk_pages(self, resource, params=None, legacy=None, order_by=None, limit=None, valrange=None, sort=None):
+
+        page = 1
+        r = self._http_resource('GET', resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, page=page)
+        yield self._resource_deserialize(r.content)
+
+        warned = False
+        while r.status_code == 206 and 'Next-Range' in r.headers and not limit:
+            #We have unexpected chunked response - deal with it
+            valrange = r.headers['Next-Range']
+            if not warned:
+                print("Warning Response was chunked, Loading the next Chunk using the following next-range header returned by Heroku '{0}'. WARNING - This breaks randomly depending on your order_by name. I think it's only guarenteed to work with id's - Looks to be a Heroku problem".format(valrange))
+                warned = True
+            page += 1
+            r = self._http_resource('GET', resource, params=params, legacy=legacy, order_by=order_by, limit=limit, valrange=valrange, sort=sort, page=page)
+            yield self._resource_deserialize(r.content)
+
+    def _iter_items(self, pages, obj, **kwargs):
+        """Yields mapped objects from decoded pages, page by page."""
+        for page in pages:
+            if isinstance(page, dict):
+                page = [page]
+            for item in page:
+                yield self._process_item(item, obj, **kwargs)
+
+    def gather(self, calls, workers=DEFAULT_WORKERS, return_exceptions=True):
+        """Runs the given callables concurrently over the shared session.
+
+        Returns their results in input order. A call that raises leaves its
+        exception in its slot, unless return_exceptions is False, in which
+        case the first failure (in input order) is raised.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        workers = min(workers, len(calls))
+        self._ensure_pool_size(workers)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(call) for call in calls]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    results.append(e)
+
+        return results
+
+    def map_apps(self, fn, apps, workers=DEFAULT_WORKERS, return_exceptions=True):
+        """Calls fn(app) for every app concurrently, see gather."""
+        return self.gather([partial(fn, app) for app in apps], workers=workers, return_exceptions=return_exceptions)
+
+    def _ensure_pool_size(self, size):
+        """Grows the session's connection pool so that concurrent calls don't discard connections."""
+        adapter = self._session.get_adapter(self._heroku_url)
+        if type(adapter) in (HTTPAdapter, TimingAdapter) and adapter._pool_maxsize < size:
+            self._session.mount(self._heroku_url, type(adapter)(pool_maxsize=size, max_retries=adapter.max_retries))
+
     def _process_items(self, d_items, obj, map=None, **kwargs):
 
         if not isinstance(d_items, list):
@@ -218,7 +679,8 @@ class HerokuCore(object):
                 print("As it's a dict, I'll try to process it anyway")
                 return self._process_item(d_items, obj, **kwargs)
 
-        items = [obj.new_from_dict(item, h=self, **kwargs) for item in d_items]
+        model = self._model_class(obj)
+        items = [model.new_from_dict(item, h=self, **kwargs) for item in d_items]
 
         if map is None:
             map = KeyedListResource
@@ -233,8 +695,8 @@ class HerokuCore(object):
 class Heroku(HerokuCore):
     """The main Heroku class."""
 
-    def __init__(self, session=None):
-        super(Heroku, self).__init__(session=session)
+    def __init__(self, session=None, **kwargs):
+        super(Heroku, self).__init__(session=session, **kwargs)
 
     def __repr__(self):
         return '<heroku-client at 0x%x>' % (id(self))
@@ -278,7 +740,7 @@ class Heroku(HerokuCore):
                 data=self._resource_serialize(payload)
             )
             r.raise_for_status()
-            item = self._resource_deserialize(r.content.decode("utf-8"))
+            item = self._resource_deserialize(r.content)
             app = App.new_from_dict(item, h=self)
         except HTTPError as e:
             if "Name is already taken" in str(e):
@@ -293,7 +755,7 @@ class Heroku(HerokuCore):
         return self._get_resources(('account/keys'), Key, map=SSHKeyListResource, **kwargs)
 
     def invoices(self,**kwargs):
-        return self._get_resources(('account/invoices'),Invoice)
+        return self._get_resources(('account/invoices'),Invoice, **kwargs)
 
     def labs(self, **kwargs):
         return self.features(**kwargs)
@@ -319,25 +781,21 @@ class Heroku(HerokuCore):
         if description:
             payload.update({'description': description})
 
-        r = self._http_resource(
+        return self._request_item(
             method='POST',
             resource=('oauth', 'authorizations'),
-            data=self._h._resource_serialize(payload)
+            obj=OAuthClient,
+            data=self._resource_serialize(payload)
         )
-        r.raise_for_status()
-        item = self._resource_deserialize(r.content.decode("utf-8"))
-        return OAuthClient.new_from_dict(item, h=self)
 
     def oauthauthorization_delete(self, oauthauthorization_id):
         """
         Destroys the OAuthAuthorization with oauthauthorization_id
         """
-        r = self._http_resource(
+        return self._request_ok(
             method='DELETE',
             resource=('oauth', 'authorizations', oauthauthorization_id)
         )
-        r.raise_for_status()
-        return r.ok
 
     def oauthclient(self, oauthclient_id):
         return self._get_resource(('oauth', 'clients', oauthclient_id), OAuthClient)
@@ -352,25 +810,21 @@ class Heroku(HerokuCore):
 
         payload = {'name': name, 'redirect_uri': redirect_uri}
 
-        r = self._http_resource(
+        return self._request_item(
             method='POST',
             resource=('oauth', 'clients'),
-            data=self._h._resource_serialize(payload)
+            obj=OAuthClient,
+            data=self._resource_serialize(payload)
         )
-        r.raise_for_status()
-        item = self._resource_deserialize(r.content.decode("utf-8"))
-        return OAuthClient.new_from_dict(item, h=self)
 
     def oauthclient_delete(self, oauthclient_id):
         """
         Destroys the OAuthClient with id oauthclient_id
         """
-        r = self._http_resource(
+        return self._request_ok(
             method='DELETE',
             resource=('oauth', 'clients', oauthclient_id)
         )
-        r.raise_for_status()
-        return r.ok
 
     def oauthtoken_create(self, client_secret=None, grant_code=None, grant_type=None, refresh_token=None):
         """
@@ -394,17 +848,71 @@ class Heroku(HerokuCore):
         if grant:
             payload.update({'grant': grant})
 
-        r = self._http_resource(
+        return self._request_item(
             method='POST',
             resource=('oauth', 'tokens'),
-            data=self._h._resource_serialize(payload)
+            obj=OAuthToken,
+            data=self._resource_serialize(payload)
         )
-        r.raise_for_status()
-        item = self._resource_deserialize(r.content.decode("utf-8"))
-        return OAuthToken.new_from_dict(item, h=self)
 
-    def run_command_on_app(self, appname, command, size=1, attach=True, printout=True, env=None):
-        """Run a remote command attach=True if you want to capture the output"""
+    def update_formation(self, app_id_or_name, updates):
+        """Scales and resizes several process types of an app with a single request, see App.update_formation."""
+        return self._request_items(
+            method='PATCH',
+            resource=('apps', app_id_or_name, 'formation'),
+            obj=Formation,
+            data=self._resource_serialize({'updates': formation_updates(updates)})
+        )
+
+    def update_formations(self, updates, workers=DEFAULT_WORKERS):
+        """Applies {app_id_or_name: updates} concurrently, one request per app.
+
+        Returns {app_id_or_name: the updated formation, or the exception raised}.
+        """
+        apps = list(updates)
+        results = self.gather([partial(self.update_formation, app, updates[app]) for app in apps], workers=workers)
+
+        return dict(zip(apps, results))
+
+    def run_command_on_app(self, appname, command, size=1, attach=True, printout=True, env=None, stream=False):
+        """Run a remote command attach=True if you want to capture the output
+
+        With stream=True, returns the unstarted Rendezvous instead of the
+        output, to read it as it arrives with iter_chunks or iter_lines.
+        """
+        return self._run_command(appname, command, size=size, attach=attach, printout=printout, env=env, stream=stream)
+
+    def run_command_on_apps(self, apps, command, size=1, env=None, on_data=None, collect=True, workers=DEFAULT_WORKERS):
+        """Runs command on a one-off dyno of every app and attaches to all of them from this thread.
+
+        Yields (app, dyno, result) as each command ends, result being its
+        output, None when collect is False, or the exception which ended
+        it. A dyno that couldn't be started is yielded first, as
+        (app, None, exception). on_data is called with (app, chunk) as
+        output arrives, see RendezvousMultiplexer.
+        """
+        apps = list(apps)
+        started = self.gather(
+            [partial(self._run_command, getattr(app, 'name', app), command, size=size, printout=False, env=env, stream=True) for app in apps],
+            workers=workers
+        )
+
+        # Sessions are keyed by position, apps needn't be hashable.
+        demux = (lambda i, data: on_data(apps[i], data)) if on_data is not None else None
+
+        dynos = {}
+        multiplexer = RendezvousMultiplexer(on_data=demux, collect=collect)
+        for (i, result) in enumerate(started):
+            if isinstance(result, Exception):
+                yield apps[i], None, result
+                continue
+            rendezvous, dynos[i] = result
+            multiplexer.add(i, rendezvous)
+
+        for (i, result) in multiplexer.run():
+            yield apps[i], dynos[i], result
+
+    def _run_command(self, app_id_or_name, command, size=1, attach=True, printout=True, env=None, stream=False, **kwargs):
         if attach:
             attach = True
         payload = {'command': command, 'attach': attach, 'size': size}
@@ -412,19 +920,19 @@ class Heroku(HerokuCore):
         if env:
             payload['env'] = env
 
-        r = self._http_resource(
+        dyno = self._request_item(
             method='POST',
-            resource=('apps', appname, 'dynos'),
-            data=self._resource_serialize(payload)
+            resource=('apps', app_id_or_name, 'dynos'),
+            obj=Dyno,
+            data=self._resource_serialize(payload),
+            **kwargs
         )
 
-        r.raise_for_status()
-        item = self._resource_deserialize(r.content.decode("utf-8"))
-        dyno = Dyno.new_from_dict(item, h=self)
-
         if attach:
-            output = Rendezvous(dyno.attach_url, printout).start()
-            return output, dyno
+            rendezvous = Rendezvous(dyno.attach_url, printout)
+            if stream:
+                return rendezvous, dyno
+            return rendezvous.start(), dyno
         else:
             return dyno
 
@@ -440,28 +948,36 @@ class Heroku(HerokuCore):
             self.rate_limit
             return int(self._ratelimit_remaining)
 
-    def stream_app_log(self, app_id_or_name, dyno=None, lines=100, source=None, timeout=False):
+    def stream_app_log(self, app_id_or_name, dyno=None, lines=100, source=None, timeout=False, parse=False):
         logger = self._app_logger(app_id_or_name, dyno=dyno, lines=lines, source=source, tail=True)
 
-        return logger.stream(timeout=timeout)
+        return logger.stream(timeout=timeout, parse=parse)
 
-    def get_app_log(self, app_id_or_name, dyno=None, lines=100, source=None, timeout=False):
+    def stream_logs(self, apps, dyno=None, source=None, lines=100, parse=False, maxsize=1000, retry=None, on_error=None, healthy_after=30):
+        """Tails the logs of all apps at once, reconnecting dropped streams.
+
+        Returns a started LogStream, iterate over it for (app, line) pairs
+        and close it when done.
+        """
+        return LogStream(
+            self, apps, dyno=dyno, source=source, lines=lines, parse=parse, maxsize=maxsize,
+            retry=retry, on_error=on_error, healthy_after=healthy_after
+        ).start()
+
+    def get_app_log(self, app_id_or_name, dyno=None, lines=100, source=None, timeout=False, parse=False):
         logger = self._app_logger(app_id_or_name, dyno=dyno, lines=lines, source=source, tail=0)
 
-        return logger.get(timeout=timeout)
+        return logger.get(timeout=timeout, parse=parse)
 
     def update_appconfig(self, app_id_or_name, config):
         payload = self._resource_serialize(config)
-        r = self._http_resource(
+        return self._request_item(
             method='PATCH',
             resource=('apps', app_id_or_name, 'config-vars'),
+            obj=ConfigVars,
             data=payload
         )
 
-        r.raise_for_status()
-        item = self._resource_deserialize(r.content.decode("utf-8"))
-        return ConfigVars.new_from_dict(item, h=self)
-
     def _app_logger(self, app_id_or_name, dyno=None, lines=100, source=None, tail=0):
         payload = {}
         if dyno:
@@ -473,20 +989,17 @@ class Heroku(HerokuCore):
         if source:
             payload['source'] = source
 
-        if lines:
+        if lines is not None:
             payload['lines'] = lines
 
-        r = self._http_resource(
+        return self._request_item(
             method='POST',
             resource=('apps', app_id_or_name, 'log-sessions'),
-            data=self._resource_serialize(payload)
+            obj=LogSession,
+            data=self._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._resource_deserialize(r.content.decode("utf-8"))
-
-        return LogSession.new_from_dict(item, h=self, app=self)
-
     @property
     def last_request_id(self):
         return self._last_request_id
@@ -494,15 +1007,14 @@ class Heroku(HerokuCore):
 class HerokuAlpha(Heroku):
     _heroku_alpha_url = HEROKU_ALPHA_URL
     """The Alpha API Heroku class."""
-    def __init__(self, session=None):
-        super(HerokuAlpha, self).__init__(session=session)
+    def __init__(self, session=None, **kwargs):
+        super(HerokuAlpha, self).__init__(session=session, **kwargs)
 
     def __repr__(self):
         return '<heroku-alpha-client at 0x%x>' % (id(self))
 
-    @staticmethod
-    def _resource_alpha_serialize(o):
-        return json.dumps(o).encode('utf8')
+    def _resource_alpha_serialize(self, o):
+        return self._resource_serialize(o)
 
     def _url_for_alpha(self, *args):
         args = list(map(str, args))
@@ -558,7 +1070,7 @@ class HerokuAlpha(Heroku):
             resource=('apps', app_id_or_name, 'github'),
             data=payload
         )
-        item = self._resource_deserialize(r.read().decode("utf-8"))
+        item = self._resource_deserialize(r.read())
         return item["id"]
 
     def enable_github_repo_autodeploy(self, app_id_or_name, repo_name, repo_id, branch_name):
@@ -579,7 +1091,7 @@ class HerokuAlpha(Heroku):
             resource=('apps', app_id_or_name, 'github'),
             data=payload
         )
-        item = self._resource_deserialize(r.read().decode("utf-8"))
+        item = self._resource_deserialize(r.read())
         return item["id"]
 
     def deploy_github_branch(self, app_id_or_name, branch_name):
@@ -592,7 +1104,7 @@ class HerokuAlpha(Heroku):
             resource=('apps', app_id_or_name, 'github', 'push'),
             data=payload
         )
-        item = self._resource_deserialize(r.read().decode("utf-8"))
+        item = self._resource_deserialize(r.read())
         return item["build"]["id"]
 
 
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.cache
+~~~~~~~~~~~~
+
+This module contains the response caches for the Heroku API.
+"""
+
+from collections import OrderedDict, namedtuple
+import hashlib
+from .compat import json
+import os
+import tempfile
+import threading
+
+
+#: A cached response: its validator, status, headers and body.
+CacheEntry = namedtuple('CacheEntry', ['etag', 'status_code', 'headers', 'content'])
+
+# Headers describing the request rather than the resource, never replayed from the cache.
+_VOLATILE_HEADERS = frozenset(['ratelimit-remaining', 'request-id', 'date', 'content-length', 'content-encoding', 'transfer-encoding', 'connection'])
+
+
+class ResponseCache(object):
+    """Bounded LRU store of ETag validated GET responses.
+
+    HerokuCore sends ``If-None-Match`` with the stored ETag of a request and
+    serves the stored body when Heroku answers 304 Not Modified.
+    """
+
+    def __init__(self, maxsize=1024):
+        super(ResponseCache, self).__init__()
+
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<response-cache {0}/{1}>'.format(len(self), self.maxsize)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url, params=None, headers=None):
+        """The cache key of a GET request, its URL, query, Range and Accept."""
+        headers = headers or {}
+        params = tuple(sorted((params or {}).items()))
+
+        return (url, params, headers.get('Range'), headers.get('Accept'))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key, r):
+        """Stores response r if it carries an ETag, returning the entry."""
+        etag = r.headers.get('ETag')
+        if not etag:
+            return None
+
+        headers = dict((k, v) for (k, v) in r.headers.items() if k.lower() not in _VOLATILE_HEADERS)
+        entry = CacheEntry(etag, r.status_code, headers, r.content)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache(object):
+    """Persistent store of API dicts for resources that never change.
+
+    Items live in namespaces, such as the releases of one app, each kept
+    as a single JSON file under *path* that is replaced atomically.
+    """
+
+    def __init__(self, path):
+        super(DiskCache, self).__init__()
+
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<disk-cache {0}>'.format(self.path)
+
+    def _file_for(self, namespace):
+        name = hashlib.sha1(namespace.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + '.json')
+
+    def items(self, namespace):
+        """Returns the dict of all items stored in namespace, by key."""
+        try:
+            with open(self._file_for(namespace), 'r') as f:
+                return json.load(f)['items']
+        except (IOError, OSError, ValueError, KeyError):
+            return {}
+
+    def get(self, namespace, key):
+        return self.items(namespace).get(str(key))
+
+    def update(self, namespace, items):
+        """Adds the given dict of items to namespace."""
+        if not items:
+            return
+
+        with self._lock:
+            stored = self.items(namespace)
+            stored.update((str(k), v) for (k, v) in items.items())
+
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'namespace': namespace, 'items': stored}, f)
+                os.replace(tmp, self._file_for(namespace))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    def clear(self, namespace):
+        with self._lock:
+            try:
+                os.unlink(self._file_for(namespace))
+            except (IOError, OSError):
+                pass
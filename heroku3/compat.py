@@ -11,3 +11,89 @@ try:
     import json
 except ImportError:
     import simplejson as json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+    """Encodes request bodies and decodes responses with the json module.
+
+    Codecs decode from the raw response bytes and encode to bytes, so no
+    intermediate str copy of a body is made where the parser allows it.
+    Decoding errors are raised as ValueError.
+    """
+    name = 'json'
+    available = True
+
+    @staticmethod
+    def loads(b):
+        # json.loads sniffs the encoding of bytes, which is slower than decoding them first.
+        if isinstance(b, bytes):
+            b = b.decode('utf-8')
+        return json.loads(b)
+
+    @staticmethod
+    def dumps(o):
+        return json.dumps(o).encode('utf-8')
+
+
+class OrjsonCodec(JSONCodec):
+    """The orjson codec, when it is installed."""
+    name = 'orjson'
+    available = orjson is not None
+
+    @staticmethod
+    def loads(b):
+        return orjson.loads(b)
+
+    @staticmethod
+    def dumps(o):
+        return orjson.dumps(o)
+
+
+class UjsonCodec(JSONCodec):
+    """The ujson codec, when it is installed."""
+    name = 'ujson'
+    available = ujson is not None
+
+    @staticmethod
+    def loads(b):
+        return ujson.loads(b)
+
+    @staticmethod
+    def dumps(o):
+        return ujson.dumps(o).encode('utf-8')
+
+
+#: Codecs by name, fastest first.
+CODECS = {'orjson': OrjsonCodec, 'ujson': UjsonCodec, 'json': JSONCodec}
+
+
+def get_codec(codec=None):
+    """Returns a codec instance by name, or the fastest one installed.
+
+    Codec instances, anything with loads and dumps, are returned as is.
+    """
+    if codec is None:
+        codec = [name for (name, cls) in CODECS.items() if cls.available][0]
+
+    if not isinstance(codec, str):
+        return codec
+
+    try:
+        cls = CODECS[codec]
+    except KeyError:
+        raise ValueError("Unknown JSON codec '{0}', expected one of {1}".format(codec, ', '.join(sorted(CODECS))))
+
+    if not cls.available:
+        raise ImportError("The '{0}' JSON codec is not installed".format(cls.name))
+
+    return cls()
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.fakeapi
+~~~~~~~~~~~~~~
+
+This module contains a local stand-in for the Heroku Platform API, for
+offline benchmarks and experiments::
+
+    with FakeHerokuAPI(apps=500, latency=0.02) as api:
+        heroku_conn = api.client()
+        apps = heroku_conn.apps()
+
+It serves apps, dynos, formation, releases, config-vars, log sessions,
+sources and builds, pages listings with Range and Next-Range headers and answers
+conditional requests, from data generated in memory.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+
+import requests
+
+
+#: Fields each listing can be ranged by, the first one being the default.
+RANGE_FIELDS = {
+    'apps': ['id', 'name', 'created_at'],
+    'dynos': ['id', 'name'],
+    'formation': ['id', 'type'],
+    'releases': ['version', 'id', 'created_at'],
+}
+
+# The field and its range are optional, "; max=10" pages by the default field.
+_RANGE_RE = re.compile(r'^\s*(?:(?P<field>[\w-]+)\s*(?P<exclusive>\]?)(?P<start>[^.;,]*)\.\.(?P<end>[^;,]*))?(?P<options>.*)$')
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _uuid(*parts):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, '/'.join(map(str, parts))))
+
+
+def _timestamp(i):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1356998400 + i * 60))
+
+
+def parse_range(header, fields):
+    """Returns (field, start, exclusive, max, order) from a Range header value."""
+    if not header:
+        return (fields[0], None, False, None, 'asc')
+
+    m = _RANGE_RE.match(header)
+    field = m.group('field') or fields[0]
+    if field not in fields:
+        raise BadRequest('Invalid Range header {0!r}, ranges are accepted on: {1}'.format(header, ', '.join(fields)))
+
+    options = dict(re.findall(r'(max|order)=(\w+)', m.group('options')))
+    start = (m.group('start') or '').strip() or None
+
+    return (field, start, bool(m.group('exclusive')), int(options['max']) if 'max' in options else None, options.get('order', 'asc'))
+
+
+class FakeHerokuAPI(object):
+    """A threaded HTTP server imitating the parts of the Heroku API clients use most.
+
+    *apps*, *dynos*, *releases* and *config_vars* size the generated data,
+    per app for the latter three, and *payload_size* pads every object
+    with that many bytes. *page_size* is the default Range max. Each
+    request is delayed by *latency* seconds, and every *ratelimit_every*
+    th request is refused with a 429, as if the budget had run out.
+    """
+
+    def __init__(self, apps=10, dynos=4, releases=20, config_vars=10, payload_size=0, page_size=200, latency=0, ratelimit_every=0, host='127.0.0.1', port=0):
+        super(FakeHerokuAPI, self).__init__()
+
+        self.page_size = page_size
+        self.latency = latency
+        self.ratelimit_every = ratelimit_every
+        self.payload_size = payload_size
+        self.address = (host, port)
+        #: The number of requests served, by method.
+        self.requests = {}
+        #: The size of each uploaded source blob, by path.
+        self.blobs = {}
+
+        self._lock = threading.Lock()
+        self._server = None
+        self._apps = {}
+        for i in range(apps):
+            self._add_app(i, dynos, releases, config_vars)
+
+    def __repr__(self):
+        return '<fake-heroku-api {0}>'.format(self.url if self._server else 'stopped')
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(*self._server.server_address[:2])
+
+    def start(self):
+        """Serves the API from a background thread, returning self."""
+        self._server = _Server(self.address, _Handler)
+        self._server.api = self
+        thread = threading.Thread(target=self._server.serve_forever, name='fake-heroku-api')
+        thread.daemon = True
+        thread.start()
+
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def client(self, session=None, **kwargs):
+        """Returns a Heroku client, configured with kwargs, talking to this server."""
+        from .api import Heroku
+
+        if session is None:
+            session = requests.session()
+            session.trust_env = False
+
+        h = Heroku(session=session, **kwargs)
+        h._heroku_url = self.url
+        h.authenticate('fake-api-key')
+
+        return h
+
+    def _pad(self, d):
+        if self.payload_size:
+            d['x_padding'] = 'x' * self.payload_size
+        return d
+
+    def _add_app(self, i, dynos, releases, config_vars):
+        app_id = _uuid('app', i)
+        app = self._pad({
+            'id': app_id,
+            'name': 'example-{0:05d}'.format(i),
+            'archived_at': None,
+            'buildpack_provided_description': 'Ruby/Rack',
+            'created_at': _timestamp(i),
+            'updated_at': _timestamp(i),
+            'released_at': _timestamp(i),
+            'git_url': 'https://git.heroku.com/example-{0:05d}.git'.format(i),
+            'web_url': 'https://example-{0:05d}.herokuapp.com/'.format(i),
+            'maintenance': False,
+            'owner': {'email': 'username@example.com', 'id': _uuid('user')},
+            'region': {'id': _uuid('region', 'us'), 'name': 'us'},
+            'stack': {'id': _uuid('stack', 'heroku-22'), 'name': 'heroku-22'},
+            'repo_size': 0,
+            'slug_size': 0,
+        })
+
+        formation = [
+            self._pad({'id': _uuid(app_id, 'formation', t), 'type': t, 'quantity': q, 'size': 'standard-1X', 'command': c,
+                       'created_at': _timestamp(i), 'updated_at': _timestamp(i), 'app': {'id': app_id, 'name': app['name']}})
+            for (t, q, c) in (('web', dynos, 'bundle exec puma'), ('worker', 0, 'bundle exec sidekiq'))
+        ]
+
+        self._apps[app_id] = {
+            'app': app,
+            'dynos': [self._dyno(app, 'web', n) for n in range(1, dynos + 1)],
+            'formation': formation,
+            'releases': [self._release(app, v) for v in range(1, releases + 1)],
+            'config-vars': dict(('CONFIG_VAR_{0}'.format(n), 'value-{0}'.format(n)) for n in range(config_vars)),
+        }
+
+    def _dyno(self, app, type, n):
+        return self._pad({
+            'id': _uuid(app['id'], 'dyno', type, n, time.time()),
+            'name': '{0}.{1}'.format(type, n),
+            'type': type,
+            'command': 'bundle exec puma',
+            'size': 'standard-1X',
+            'state': 'up',
+            'attach_url': None,
+            'created_at': _timestamp(n),
+            'updated_at': _timestamp(n),
+            'release': {'id': _uuid(app['id'], 'release', 1), 'version': 1},
+            'app': {'id': app['id'], 'name': app['name']},
+        })
+
+    def _release(self, app, version):
+        return self._pad({
+            'id': _uuid(app['id'], 'release', version),
+            'version': version,
+            'description': 'Deploy {0:07x}'.format(version),
+            'status': 'succeeded',
+            'current': False,
+            'created_at': _timestamp(version),
+            'updated_at': _timestamp(version),
+            'slug': {'id': _uuid(app['id'], 'slug', version)},
+            'user': {'email': 'username@example.com', 'id': _uuid('user')},
+            'addon_plan_names': ['heroku-postgresql:mini'],
+            'app': {'id': app['id'], 'name': app['name']},
+        })
+
+    def _find_app(self, id_or_name):
+        state = self._apps.get(id_or_name)
+        if state is None:
+            for candidate in self._apps.values():
+                if candidate['app']['name'] == id_or_name:
+                    return candidate
+            raise NotFound('app')
+        return state
+
+    def _paginate(self, items, header, collection):
+        """Returns (status, page, headers) for a Range request on a listing."""
+        fields = RANGE_FIELDS[collection]
+        (field, start, exclusive, max_items, order) = parse_range(header, fields)
+        max_items = min(max_items or self.page_size, 1000)
+
+        def key(item):
+            return item[field]
+
+        items = sorted(items, key=key, reverse=(order == 'desc'))
+        if start is not None:
+            if isinstance(items[0][field] if items else None, int):
+                start = int(start)
+            if order == 'desc':
+                items = [i for i in items if key(i) < start or (key(i) == start and not exclusive)]
+            else:
+                items = [i for i in items if key(i) > start or (key(i) == start and not exclusive)]
+
+        page = items[:max_items]
+        headers = {'Accept-Ranges': ', '.join(fields), 'Content-Range': '{0} {1}..{2}'.format(field, key(page[0]) if page else '', key(page[-1]) if page else '')}
+        if len(items) > max_items:
+            next_range = '{0} ]{1}..; max={2}'.format(field, key(page[-1]), max_items)
+            if order == 'desc':
+                next_range += '; order=desc'
+            headers['Next-Range'] = next_range
+            return (206, page, headers)
+
+        return (200, page, headers)
+
+    def handle(self, method, path, headers, body):
+        """Returns (status, body, headers) for an API request."""
+        with self._lock:
+            count = sum(self.requests.values()) + 1
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.ratelimit_every and count % self.ratelimit_every == 0:
+            return (429, {'id': 'rate_limit', 'message': 'Your account reached the API rate limit'}, {'Retry-After': '0'})
+
+        parts = path.split('?')[0].strip('/').split('/')
+
+        try:
+            with self._lock:
+                return self._route(method, parts, headers, body)
+        except NotFound as e:
+            return (404, {'id': 'not_found', 'message': "Couldn't find that {0}.".format(e)}, {})
+        except BadRequest as e:
+            return (400, {'id': 'bad_request', 'message': str(e)}, {})
+
+    def _route(self, method, parts, headers, body):
+        if parts == ['account', 'rate-limits'] and method == 'GET':
+            return (200, {'remaining': 4500}, {})
+
+        if parts[0] != 'apps':
+            raise NotFound('resource')
+
+        if len(parts) == 1 and method == 'GET':
+            return self._paginate([s['app'] for s in self._apps.values()], headers.get('Range'), 'apps')
+
+        state = self._find_app(parts[1])
+        collection = parts[2] if len(parts) > 2 else None
+        ident = parts[3] if len(parts) > 3 else None
+
+        if collection is None and method == 'GET':
+            return (200, state['app'], {})
+
+        if collection == 'log-sessions' and method == 'POST':
+            body = body or {}
+            session_id = str(uuid.uuid4())
+            query = 'lines={0}&tail={1}'.format(body.get('lines', 100), int(bool(body.get('tail'))))
+            return (201, {
+                'id': session_id,
+                'logplex_url': '{0}/logs/{1}/{2}?{3}'.format(self.url, state['app']['id'], session_id, query),
+                'created_at': _timestamp(0),
+                'updated_at': _timestamp(0),
+            }, {})
+
+        if collection == 'sources' and method == 'POST':
+            blob_url = '{0}/blobs/{1}'.format(self.url, uuid.uuid4())
+            return (201, {'source_blob': {'get_url': blob_url, 'put_url': blob_url}}, {})
+
+        if collection == 'builds' and method == 'POST':
+            build = {
+                'id': str(uuid.uuid4()),
+                'status': 'pending',
+                'source_blob': body['source_blob'],
+                'app': {'id': state['app']['id']},
+                'created_at': _timestamp(0),
+                'updated_at': _timestamp(0),
+            }
+            state.setdefault('builds', []).append(build)
+            return (201, build, {})
+
+        if collection == 'config-vars':
+            if method == 'PATCH':
+                for (k, v) in body.items():
+                    if v is None:
+                        state['config-vars'].pop(k, None)
+                    else:
+                        state['config-vars'][k] = v
+            return (200, state['config-vars'], {})
+
+        if collection not in ('dynos', 'formation', 'releases'):
+            raise NotFound(collection)
+
+        items = state[collection]
+        if ident is None:
+            if method == 'GET':
+                return self._paginate(items, headers.get('Range'), collection)
+            if method == 'DELETE' and collection == 'dynos':
+                state['dynos'] = [self._dyno(state['app'], d['type'], int(d['name'].split('.')[-1])) for d in items]
+                return (202, {}, {})
+            if method == 'PATCH' and collection == 'formation':
+                return (200, [self._update_formation(state, update) for update in body['updates']], {})
+            raise NotFound(collection)
+
+        item = self._find_item(items, ident, collection)
+        if method == 'GET':
+            return (200, item, {})
+        if method == 'PATCH' and collection == 'formation':
+            return (200, self._update_formation(state, dict(body, type=item['type'])), {})
+        if method == 'DELETE' and collection == 'dynos':
+            items[items.index(item)] = self._dyno(state['app'], item['type'], int(item['name'].split('.')[-1]))
+            return (202, {}, {})
+
+        raise NotFound(collection)
+
+    def upload(self, path, stream, length):
+        """Stores the size of a source blob PUT, returning (status, body, headers)."""
+        received = 0
+        while received < length:
+            chunk = stream.read(min(length - received, 1024 * 1024))
+            if not chunk:
+                break
+            received += len(chunk)
+
+        with self._lock:
+            self.requests['PUT'] = self.requests.get('PUT', 0) + 1
+            self.blobs[path] = received
+
+        return (200, b'', {})
+
+    def logs(self, path):
+        """Returns (status, body, headers) for a logplex URL: the requested lines, after which a tail ends."""
+        with self._lock:
+            self.requests['LOGS'] = self.requests.get('LOGS', 0) + 1
+            state = self._apps.get(path.split('/')[2])
+
+        if state is None:
+            return (404, b'', {})
+
+        lines = int(re.search(r'lines=(\d+)', path).group(1))
+        name = state['app']['name']
+        content = ''.join(
+            '{0} app[web.{1}]: {2} line {3}\n'.format(time.strftime('%Y-%m-%dT%H:%M:%S.000000+00:00', time.gmtime()), n % 4 + 1, name, n)
+            for n in range(lines)
+        )
+
+        return (200, content.encode('utf-8'), {})
+
+    @staticmethod
+    def _find_item(items, ident, collection):
+        for item in items:
+            if ident in (item['id'], item.get('name'), item.get('type'), str(item.get('version'))):
+                return item
+        raise NotFound(collection.rstrip('s'))
+
+    def _update_formation(self, state, update):
+        process = self._find_item(state['formation'], update['type'], 'formation')
+        for key in ('quantity', 'size'):
+            if update.get(key) is not None:
+                process[key] = update[key]
+
+        return process
+
+
+class _Server(ThreadingHTTPServer):
+    # Benchmarks open many connections at once, the default backlog of 5 drops some.
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if self.path.startswith('/blobs/'):
+            return self._send_text(*self.server.api.upload(self.path, self.rfile, length)[:2])
+
+        raw = self.rfile.read(length) if length else b''
+        body = json.loads(raw.decode('utf-8')) if raw else None
+
+        if self.path.startswith('/logs/'):
+            (status, obj, headers) = self.server.api.logs(self.path)
+        else:
+            (status, obj, headers) = self.server.api.handle(self.command, self.path, self.headers, body)
+        if isinstance(obj, bytes):
+            return self._send_text(status, obj)
+
+        content = json.dumps(obj).encode('utf-8')
+        etag = '"{0}"'.format(hashlib.md5(content).hexdigest())
+
+        if self.command == 'GET' and status in (200, 206) and self.headers.get('If-None-Match') == etag:
+            status, content = 304, b''
+
+        self.send_response(status)
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.send_header('Request-Id', str(uuid.uuid4()))
+        self.send_header('RateLimit-Remaining', '0' if status == 429 else '4500')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_text(self, status, content):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_PATCH = do_POST = do_DELETE = do_PUT = _dispatch
@@ -11,7 +11,9 @@ from datetime import datetime
 
 from dateutil.parser import parse as parse_datetime
 
+import queue
 import sys
+import threading
 
 if sys.version_info > (3, 0):
     basestring = (str, bytes)
@@ -29,6 +31,70 @@ def is_collection(obj):
     return val
 
 
+def parse_date(value):
+    """Parses an API timestamp.
+
+    Heroku sends fixed format ISO 8601 timestamps such as
+    ``2012-01-01T12:00:00Z``, which the standard library parses quickly.
+    Anything else falls back to dateutil.
+    """
+    try:
+        if value.endswith('Z'):
+            return datetime.fromisoformat(value[:-1] + '+00:00')
+        return datetime.fromisoformat(value)
+    except (AttributeError, TypeError, ValueError):
+        return parse_datetime(value)
+
+
+_EXHAUSTED = object()
+
+
+def read_ahead(iterable, depth):
+    """Iterates over iterable from a background thread, keeping up to depth items ready.
+
+    Exceptions raised by the iterable are re-raised in the consuming thread.
+    Closing the returned generator stops the background thread after the
+    item it is currently producing.
+    """
+
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                ready.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_EXHAUSTED, e))
+        else:
+            put((_EXHAUSTED, None))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            item, error = ready.get()
+            if item is _EXHAUSTED:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
 # from kennethreitz/python-github3
 def to_python(obj,
     in_dict,
@@ -60,7 +126,7 @@ def to_python(obj,
             in_date = in_dict.get(in_key)
             if in_date is not None:
                 try:
-                    out_date = parse_datetime(in_date)
+                    out_date = parse_date(in_date)
                 except TypeError as e:
                     raise e
                     out_date = None
@@ -106,6 +172,130 @@ def to_python(obj,
     return obj
 
 
+def compile_hydrator(cls):
+    """Generates the function that maps an API dict onto a new cls instance.
+
+    The function does the same work as :func:`to_python` with the key lists
+    declared on cls, unrolled into straight-line code, and starts from a
+    copy of a freshly initialised instance's attributes instead of running
+    __init__ for every object. Dates are stored as sent, to be parsed on
+    first access by the model. Its signature is ``hydrate(in_dict, h, kwargs)``.
+    """
+
+    template = cls().__dict__.copy()
+    namespace = {
+        'cls': cls,
+        'new': object.__new__,
+        'template': template,
+    }
+
+    lines = [
+        'def hydrate(in_dict, h, kwargs):',
+        '    get = in_dict.get',
+        '    d = template.copy()',
+    ]
+
+    for key in cls._strs + cls._dates:
+        lines.append('    d[{0!r}] = get({0!r})'.format(key))
+
+    for (keys, cast) in ((cls._ints, 'int'), (cls._bools, 'bool'), (cls._dicts, 'dict')):
+        for key in keys:
+            lines.append('    value = get({0!r})'.format(key))
+            lines.append('    if value is not None:')
+            lines.append('        d[{0!r}] = {1}(value)'.format(key, cast))
+
+    for (i, (key, obj)) in enumerate(cls._map.items()):
+        namespace['map_{0}'.format(i)] = obj
+        lines.append('    value = get({0!r})'.format(key))
+        lines.append('    if value:')
+        lines.append('        d[{0!r}] = map_{1}.new_from_dict(value)'.format(key, i))
+
+    for (i, (key, obj)) in enumerate(cls._arrays.items()):
+        namespace['array_{0}'.format(i)] = obj
+        lines.append('    value = get({0!r})'.format(key))
+        lines.append('    if value:')
+        lines.append('        d[{0!r}] = [array_{1}.new_from_dict(i) for i in value]'.format(key, i))
+
+    lines.extend([
+        "    d['_in_dict'] = in_dict",
+        "    d['_h'] = h",
+        '    if kwargs:',
+        '        d.update(kwargs)',
+        '    obj = new(cls)',
+        '    obj.__dict__ = d',
+        '    return obj',
+    ])
+
+    exec(compile('\n'.join(lines), '<hydrate {0}>'.format(cls.__name__), 'exec'), namespace)
+
+    return namespace['hydrate']
+
+
+def compile_slots_hydrator(cls, compact, keep_raw=True):
+    """Generates the hydrate function of compact, the __slots__ variant of cls.
+
+    Works like :func:`compile_hydrator`, assigning slots instead of filling
+    an instance dict. Dates are kept in ``_date_<name>`` slots until they are
+    first read. Nested objects are built from the compact variants of their
+    classes. Unless keep_raw is set, the API dict is not retained in _in_dict.
+    """
+
+    template = cls().__dict__
+    namespace = {
+        'cls': compact,
+        'new': object.__new__,
+        'defaults': template,
+    }
+
+    lines = [
+        'def hydrate(in_dict, h, kwargs):',
+        '    get = in_dict.get',
+        '    obj = new(cls)',
+    ]
+
+    assigned = set(cls._strs) | set(cls._dates) | set(['_h', '_in_dict'])
+    for (key, value) in template.items():
+        if key not in assigned:
+            default = 'None' if value is None else 'defaults[{0!r}]'.format(key)
+            lines.append('    obj.{0} = {1}'.format(key, default))
+
+    for key in cls._strs:
+        lines.append('    obj.{0} = get({0!r})'.format(key))
+
+    for key in cls._dates:
+        lines.append('    obj._date_{0} = get({0!r})'.format(key))
+
+    for (keys, cast) in ((cls._ints, 'int'), (cls._bools, 'bool'), (cls._dicts, 'dict')):
+        for key in keys:
+            lines.append('    value = get({0!r})'.format(key))
+            lines.append('    if value is not None:')
+            lines.append('        obj.{0} = {1}(value)'.format(key, cast))
+
+    for (i, (key, obj)) in enumerate(cls._map.items()):
+        namespace['map_{0}'.format(i)] = obj.compact_class(keep_raw=keep_raw)
+        lines.append('    value = get({0!r})'.format(key))
+        lines.append('    if value:')
+        lines.append('        obj.{0} = map_{1}.new_from_dict(value)'.format(key, i))
+
+    for (i, (key, obj)) in enumerate(cls._arrays.items()):
+        namespace['array_{0}'.format(i)] = obj.compact_class(keep_raw=keep_raw)
+        lines.append('    value = get({0!r})'.format(key))
+        lines.append('    if value:')
+        lines.append('        obj.{0} = [array_{1}.new_from_dict(i) for i in value]'.format(key, i))
+
+    lines.extend([
+        '    obj._in_dict = {0}'.format('in_dict' if keep_raw else 'None'),
+        '    obj._h = h',
+        '    for (key, value) in kwargs.items():',
+        '        setattr(obj, key, value)',
+        '    return obj',
+    ])
+
+    exec(compile('\n'.join(lines), '<hydrate compact {0}>'.format(cls.__name__), 'exec'), namespace)
+
+    return namespace['hydrate']
+
+
 # from kennethreitz/python-github3
 def to_api(in_dict, int_keys=None, date_keys=None, bool_keys=None):
     """Extends a given object for API Production."""
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.instrumentation
+~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the request events and metrics collectors for the Heroku API.
+"""
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import bisect
+import math
+import threading
+import time
+
+
+#: The hook events, called with a RequestEvent.
+HOOK_EVENTS = ('pre_request', 'response')
+
+#: API collections, and the name of the identifier which follows them in a path.
+COLLECTIONS = {
+    'addon-services': 'service',
+    'addons': 'addon',
+    'app-transfers': 'transfer',
+    'apps': 'app',
+    'authorizations': 'authorization',
+    'builds': 'build',
+    'clients': 'client',
+    'collaborators': 'collaborator',
+    'domains': 'domain',
+    'dynos': 'dyno',
+    'features': 'feature',
+    'formation': 'type',
+    'invoices': 'invoice',
+    'keys': 'key',
+    'log-drains': 'log_drain',
+    'pipelines': 'pipeline',
+    'regions': 'region',
+    'releases': 'release',
+    'slugs': 'slug',
+    'spaces': 'space',
+    'stacks': 'stack',
+    'teams': 'team',
+}
+
+
+def template_path(resource):
+    """Returns the path of a resource with its identifiers templated, e.g. apps/{app}/dynos."""
+    parts = []
+    previous = None
+    for part in '/'.join(map(str, resource)).split('/'):
+        if previous in COLLECTIONS:
+            parts.append('{' + COLLECTIONS[previous] + '}')
+            previous = None
+        else:
+            parts.append(part)
+            previous = part
+
+    return '/'.join(parts)
+
+
+class RequestEvent(object):
+    """What happened to one API call, handed to the request hooks.
+
+    Latencies are in seconds. *connect* and *ttfb* (time to first byte,
+    up to the response headers) describe the last attempt, *connect* is
+    None when it reused a pooled connection. *total* covers the whole
+    call, retries and rate limit waits included, of which *wait* was
+    spent sleeping. *page* is the position of the request in a Range
+    paginated listing, and *ratelimit_delta* the change of Heroku's
+    ratelimit-remaining header across the call.
+    """
+
+    def __init__(self, method, path, url, page=None, range=None):
+        super(RequestEvent, self).__init__()
+
+        self.method = method
+        self.path = path
+        self.url = url
+        self.page = page
+        self.range = range
+        self.status = None
+        self.bytes = 0
+        self.connect = None
+        self.ttfb = None
+        self.total = None
+        self.wait = 0
+        self.retries = 0
+        self.ratelimit_remaining = None
+        self.ratelimit_delta = None
+        self.request_id = None
+        self.cached = False
+        self.error = None
+        self._started = time.perf_counter()
+
+    def __repr__(self):
+        return '<request-event {0} {1} {2}>'.format(self.method, self.path, self.status)
+
+
+class LatencyHistogram(object):
+    """In-memory histogram of response event latencies, per method and templated path.
+
+    Latencies fall into logarithmic buckets *precision* apart (about 9% by
+    default), so percentiles are approximate but memory stays constant.
+    Pass an instance to ``add_hook('response', ...)``.
+    """
+
+    def __init__(self, precision=2 ** 0.125, minimum=0.001):
+        super(LatencyHistogram, self).__init__()
+
+        self.precision = precision
+        self.minimum = minimum
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<latency-histogram {0} endpoints>'.format(len(self._series))
+
+    def __call__(self, event):
+        self.record(event.method, event.path, event.total)
+
+    def _bucket(self, seconds):
+        if seconds <= self.minimum:
+            return 0
+        return int(math.ceil(math.log(seconds / self.minimum, self.precision)))
+
+    def _bound(self, bucket):
+        return self.minimum * self.precision ** bucket
+
+    def record(self, method, path, seconds):
+        bucket = self._bucket(seconds)
+        with self._lock:
+            series = self._series.setdefault((method, path), {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': {}})
+            series['count'] += 1
+            series['sum'] += seconds
+            series['max'] = max(series['max'], seconds)
+            series['buckets'][bucket] = series['buckets'].get(bucket, 0) + 1
+
+    def percentile(self, q, method, path):
+        """The latency under which fraction q of the calls to method and path completed."""
+        with self._lock:
+            series = self._series.get((method, path))
+            if series is None:
+                return None
+            buckets = sorted(series['buckets'].items())
+            count = series['count']
+
+        cumulative = []
+        seen = 0
+        for (bucket, n) in buckets:
+            seen += n
+            cumulative.append(seen)
+
+        i = bisect.bisect_left(cumulative, max(1, int(math.ceil(q * count))))
+        return min(self._bound(buckets[i][0]), series['max'])
+
+    def summary(self, percentiles=(0.5, 0.99)):
+        """Returns {(method, path): {'count', 'mean', 'max', 'p50', 'p99'}} for export."""
+        with self._lock:
+            keys = list(self._series)
+
+        summary = {}
+        for (method, path) in keys:
+            series = self._series[(method, path)]
+            stats = {'count': series['count'], 'mean': series['sum'] / series['count'], 'max': series['max']}
+            for q in percentiles:
+                stats['p{0:g}'.format(q * 100)] = self.percentile(q, method, path)
+            summary[(method, path)] = stats
+
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+# Connect times, left by the connection of the request running on this thread.
+_timings = threading.local()
+
+
+class _TimedConnectMixin(object):
+
+    def connect(self):
+        start = time.perf_counter()
+        super(_TimedConnectMixin, self).connect()
+        _timings.connect = time.perf_counter() - start
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long establishing them took."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool, 'https': _TimedHTTPSConnectionPool}
+
+
+def pop_connect_time():
+    """Returns and forgets the connect time recorded on this thread, if any."""
+    seconds = getattr(_timings, 'connect', None)
+    _timings.connect = None
+    return seconds
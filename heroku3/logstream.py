@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.logstream
+~~~~~~~~~~~~~~~~
+
+This module contains the multi-app log tail, which keeps a log session
+open per app, reconnects them as they drop and merges their lines::
+
+    with heroku_conn.stream_logs(apps) as logs:
+        for app, line in logs:
+            ...
+"""
+
+import queue
+import threading
+import time
+
+from .models.logsession import parse_logline
+from .retry import RetryPolicy
+
+
+_DONE = object()
+
+
+class LogStream(object):
+    """Tails the logs of many apps at once, yielding (app, line) as lines arrive.
+
+    Each app is followed from its own thread. When a stream ends or fails,
+    a new log session is created after a backoff from *retry*, which gives
+    up on an app after max_retries consecutive failures: errors, and
+    streams which ended without a line within *healthy_after* seconds. A
+    quiet app whose sessions stay open and expire is followed for good.
+    Reconnections don't ask for past lines again, so lines logged while
+    disconnected are lost.
+
+    Lines wait in a queue of at most *maxsize* entries; once it is full the
+    tails stop reading until the consumer catches up. Failures are passed
+    to *on_error* as (app, exception), or printed.
+    """
+
+    def __init__(self, h, apps, dyno=None, source=None, lines=100, parse=False, maxsize=1000, retry=None, on_error=None, healthy_after=30):
+        super(LogStream, self).__init__()
+
+        if retry is None:
+            retry = RetryPolicy(max_retries=10, backoff_factor=1, max_backoff=60)
+
+        self._h = h
+        self.apps = list(apps)
+        self.dyno = dyno
+        self.source = source
+        self.lines = lines
+        self.parse = parse
+        self.retry = retry
+        self.on_error = on_error
+        self.healthy_after = healthy_after
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._responses = {}
+        self._threads = []
+
+    def __repr__(self):
+        return '<log-stream {0} apps>'.format(len(self.apps))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """Starts a tail per app, returning self."""
+        for (i, app) in enumerate(self.apps):
+            thread = threading.Thread(target=self._tail, args=(i, app), name='heroku3-logs-{0}'.format(i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+        return self
+
+    def close(self):
+        """Stops every tail, interrupting reads in progress."""
+        self._stop.set()
+        with self._lock:
+            responses = list(self._responses.values())
+        for r in responses:
+            r.close()
+
+    def __iter__(self):
+        running = len(self._threads)
+        try:
+            while running and not self._stop.is_set():
+                try:
+                    app, line = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if line is _DONE:
+                    running -= 1
+                    continue
+                yield app, line
+        finally:
+            self.close()
+
+    def _put(self, entry):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _tail(self, i, app):
+        lines = self.lines
+        attempt = 0
+        try:
+            while not self._stop.is_set():
+                opened = time.monotonic()
+                try:
+                    if self._follow(i, app, lines):
+                        # Only new lines from here on.
+                        lines = 0
+                        attempt = 0
+                    elif time.monotonic() - opened >= self.healthy_after:
+                        attempt = 0
+                except Exception as e:
+                    if self._stop.is_set():
+                        return
+                    self._error(app, e)
+
+                if attempt >= self.retry.max_retries:
+                    self._error(app, Exception('Giving up on the logs of {0} after {1} attempts'.format(app, attempt)))
+                    return
+                self._stop.wait(self.retry.backoff(attempt))
+                attempt += 1
+        finally:
+            self._put((app, _DONE))
+
+    def _follow(self, i, app, lines):
+        """Reads one log session to its end, returning whether it delivered any line."""
+        name = getattr(app, 'name', app)
+        session = self._h._app_logger(name, dyno=self.dyno, lines=lines, source=self.source, tail=True)
+        r = self._h._external_request('GET', session.logplex_url, stream=True)
+        with self._lock:
+            self._responses[i] = r
+
+        received = False
+        try:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                if not self._put((app, parse_logline(line) if self.parse else line)):
+                    break
+                received = True
+        finally:
+            with self._lock:
+                self._responses.pop(i, None)
+            r.close()
+
+        return received
+
+    def _error(self, app, e):
+        if self.on_error is not None:
+            self.on_error(app, e)
+        else:
+            print("Warning, the log stream of '{0}' failed: {1!r}".format(app, e))
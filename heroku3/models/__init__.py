@@ -7,7 +7,7 @@ heroku3.models
 This module contains the models that comprise the Heroku API.
 """
 
-from ..helpers import to_python
+from ..helpers import compile_hydrator, compile_slots_hydrator, parse_date
 #from .structures import DynoListResource#, filtered_key_list_resource_factory
 #from .rendezvous import Rendezvous
 from pprint import pprint # noqa
@@ -19,7 +19,87 @@ else:
     from urllib import quote # noqa
 
 
-class BaseResource(object):
+class LazyDate(object):
+    """Date attribute which is parsed from its API string on first access.
+
+    The value lives in the instance dict under the same name, or in the
+    given slot for compact models.
+    """
+
+    def __init__(self, name, slot=None):
+        self.name = name
+        self.slot = slot
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+
+        if self.slot is None:
+            try:
+                value = obj.__dict__[self.name]
+            except KeyError:
+                raise AttributeError(self.name)
+        else:
+            value = getattr(obj, self.slot)
+
+        if isinstance(value, str):
+            value = parse_date(value)
+            self.__set__(obj, value)
+
+        return value
+
+    def __set__(self, obj, value):
+        if self.slot is None:
+            obj.__dict__[self.name] = value
+        else:
+            setattr(obj, self.slot, value)
+
+
+class ResourceType(type):
+    """Metaclass of the models, makes compact classes pass for the model they were made from."""
+
+    def __instancecheck__(cls, instance):
+        return cls.__subclasscheck__(type(instance))
+
+    def __subclasscheck__(cls, subclass):
+        return type.__subclasscheck__(cls, getattr(subclass, '_compact_of', subclass))
+
+
+# Class attributes which are not carried over to compact classes.
+_NOT_COMPACTED = frozenset(['__dict__', '__weakref__', '__init__', '__init_subclass__', '_hydrate', '_key_list', '_compact_classes'])
+
+
+def _make_compact_class(cls, keep_raw):
+    template = cls().__dict__
+    dates = set(cls._dates)
+
+    slots = [k for k in template if k not in dates]
+    slots.extend(k for k in cls._dicts if k not in template)
+    slots.extend('_date_{0}'.format(k) for k in cls._dates)
+    # Extra keyword arguments given to new_from_dict still have somewhere to go,
+    # the dict is only allocated for instances which get one.
+    slots.extend(['_in_dict', '__dict__'])
+
+    namespace = {}
+    for klass in reversed(cls.__mro__[:-1]):
+        namespace.update((k, v) for (k, v) in klass.__dict__.items() if k not in _NOT_COMPACTED)
+
+    for name in slots:
+        namespace.pop(name, None)
+
+    for name in cls._dates:
+        namespace[name] = LazyDate(name, slot='_date_{0}'.format(name))
+
+    namespace['__slots__'] = tuple(slots)
+    namespace['_compact_of'] = cls
+
+    compact = ResourceType(cls.__name__, (object,), namespace)
+    compact._hydrate = staticmethod(compile_slots_hydrator(cls, compact, keep_raw=keep_raw))
+
+    return compact
+
+
+class BaseResource(object, metaclass=ResourceType):
 
     _strs = []
     _ints = []
@@ -29,6 +109,7 @@ class BaseResource(object):
     _map = {}
     _arrays = {}
     _pks = []
+    _immutable = False
     order_by = 'id'
 
     def __init__(self):
@@ -36,6 +117,13 @@ class BaseResource(object):
         self._h = None
         super(BaseResource, self).__init__()
 
+    def __init_subclass__(cls, **kwargs):
+        super(BaseResource, cls).__init_subclass__(**kwargs)
+
+        for name in cls._dates:
+            if not isinstance(getattr(cls, name, None), LazyDate):
+                setattr(cls, name, LazyDate(name))
+
     def __repr__(self):
         return "<resource '{0}'>".format(self._id)
 
@@ -46,8 +134,14 @@ class BaseResource(object):
             setattr(self, attr, None)
 
     def _keys(self):
-        return self._strs + self._ints + self._dates + self._bools + \
-            list(self._map.keys()) + list(self._arrays.keys())
+        cls = type(self)
+        keys = cls.__dict__.get('_key_list')
+        if keys is None:
+            keys = cls._strs + cls._ints + cls._dates + cls._bools + \
+                list(cls._map.keys()) + list(cls._arrays.keys())
+            cls._key_list = keys
+
+        return keys
 
     @property
     def _id(self):
@@ -72,7 +166,7 @@ class BaseResource(object):
     def dict(self):
         d = dict()
         for k in self._keys():
-            d[k] = self.__dict__.get(k)
+            d[k] = getattr(self, k, None)
 
         return d
 
@@ -83,22 +177,41 @@ class BaseResource(object):
     @classmethod
     def new_from_dict(cls, d, h=None, **kwargs):
 
-        d = to_python(
-            obj=cls(),
-            in_dict=d,
-            str_keys=cls._strs,
-            int_keys=cls._ints,
-            date_keys=cls._dates,
-            bool_keys=cls._bools,
-            dict_keys=cls._dicts,
-            object_map=cls._map,
-            array_map=cls._arrays,
-            _h=h
-        )
-
-        d.__dict__.update(kwargs)
+        # Hydrators are compiled once per class, on first use.
+        hydrate = cls.__dict__.get('_hydrate')
+        if hydrate is None:
+            hydrate = compile_hydrator(cls)
+            cls._hydrate = staticmethod(hydrate)
+        else:
+            hydrate = hydrate.__func__
 
-        return d
+        return hydrate(d, h, kwargs)
+
+    @classmethod
+    def is_immutable(cls, d):
+        """Whether the resource described by API dict d will never change again.
+
+        Only models flagged _immutable are asked, those whose resources
+        settle at some point can refine the answer here.
+        """
+        return cls._immutable
+
+    @classmethod
+    def compact_class(cls, keep_raw=True):
+        """Returns a __slots__ based variant of this model, for keeping many objects in memory.
+
+        Its instances have no per-object attribute dict and, unless keep_raw
+        is set, don't retain the API dict in _in_dict. isinstance checks
+        against the model still hold.
+        """
+        compact_classes = cls.__dict__.get('_compact_classes')
+        if compact_classes is None:
+            compact_classes = cls._compact_classes = {}
+
+        if keep_raw not in compact_classes:
+            compact_classes[keep_raw] = _make_compact_class(cls, keep_raw)
+
+        return compact_classes[keep_raw]
 
 
 class Price(BaseResource):
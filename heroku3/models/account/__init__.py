@@ -27,26 +27,21 @@ class Account(BaseResource):
         )
 
     def add_key(self, key):
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('account', 'keys'),
+            obj=Key,
             data=self._h._resource_serialize({'public_key': key})
         )
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Key.new_from_dict(item, h=self._h)
 
     def remove_key(self, key_or_fingerprint):
         """Deletes the key."""
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='DELETE',
-            resource=('account', 'keys', quote(key_or_fingerprint))
+            resource=('account', 'keys', quote(key_or_fingerprint)),
+            obj=Key
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Key.new_from_dict(item, h=self._h)
-
     def disable_feature(self, id_or_name):
         return self.update_feature(id_or_name, 0)
 
@@ -56,21 +51,17 @@ class Account(BaseResource):
     def update_feature(self, id_or_name, enabled):
 
         payload = {'enabled': enabled}
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('account', 'features', id_or_name),
-            data=self._h._resource_serialize(payload)
+            obj=AccountFeature,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return AccountFeature.new_from_dict(item, h=self._h, app=self)
-
     def change_password(self, current_password, new_password):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='PUT',
             resource=('account', 'password'),
             data=self._h._resource_serialize({'current_password': current_password, 'new_password': new_password})
         )
-        r.raise_for_status()
-        return r.ok
@@ -15,13 +15,11 @@ class AccountFeature(BaseResource):
         return "<account_feature '{0}'>".format(self.name)
 
     def update(self, enabled):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='POST',
             resource=('account', 'features', self.id),
             data=self._h._resource_serialize({'enabled': enabled})
         )
-        r.raise_for_status()
-        return r.ok
 
     def enable(self):
         return self.update(True)
@@ -14,12 +14,10 @@ class Addon(BaseResource):
 
     def delete(self):
         """Uninstalls the addon"""
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.app.id, 'addons', self.id)
         )
-        r.raise_for_status()
-        return r.ok
 
     def upgrade(self, plan_id_or_name):
 
@@ -27,12 +25,10 @@ class Addon(BaseResource):
 
         payload = {'plan': plan_id_or_name}
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.app.id, 'addons', self.id),
-            data=self._h._resource_serialize(payload)
+            obj=Addon,
+            data=self._h._resource_serialize(payload),
+            app=self.app
         )
-
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Addon.new_from_dict(item, h=self._h, app=self.app)
@@ -1,5 +1,4 @@
 from ..models import BaseResource, User, Stack
-from ..rendezvous import Rendezvous
 from ..structures import DynoListResource
 
 from .addon import Addon
@@ -9,15 +8,21 @@ from .collaborator import Collaborator
 from .configvars import ConfigVars
 from .domain import Domain
 from .dyno import Dyno
-from .formation import Formation
+from .formation import Formation, formation_updates
 from .logdrain import LogDrain
-from .logsession import LogSession
 from .region import Region
 from .release import Release
 from .slug import Slug
 
+from collections import OrderedDict
+from functools import partial
 from pprint import pprint # NOQA
+import os
+import shutil
 import sys
+import tarfile
+import tempfile
+import time
 
 if sys.version_info > (3, 0):
     from urllib.parse import quote
@@ -25,6 +30,10 @@ else:
     from urllib import quote # noqa
 
 
+#: Bytes copied at a time when spooling an unseekable tarball.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
 class App(BaseResource):
     """Heroku App."""
 
@@ -79,40 +88,79 @@ class App(BaseResource):
             }
         }
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('apps', self.name, 'builds'),
-            data=self._h._resource_serialize(payload)
+            obj=Build,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Build.new_from_dict(item, h=self._h, app=self)
-
     def create_source(self, **kwargs):
         """
         Creates a new source.
         """
         payload = {}
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('apps', self.name, 'sources'),
-            data=self._h._resource_serialize(payload)
+            obj=Source,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Source.new_from_dict(item, h=self._h, app=self)
+    def deploy_tarball(self, fileobj, version=None):
+        """
+        Uploads a .tar.gz source and starts a build of it, returning the Build.
+
+        The file is streamed to the source's put_url, never read into
+        memory. The upload needs its length up front, a stream that can't
+        seek is first copied to a temporary file.
+        """
+        self._h._require_sync('App.deploy_tarball')
+        seekable = getattr(fileobj, 'seekable', None)
+        if seekable is None or not seekable():
+            with tempfile.TemporaryFile() as spooled:
+                shutil.copyfileobj(fileobj, spooled, UPLOAD_CHUNK_SIZE)
+                spooled.seek(0)
+                return self.deploy_tarball(spooled, version)
+
+        source = self.create_source()
+        r = self._h._external_request('PUT', source.source_blob['put_url'], data=fileobj)
+        r.raise_for_status()
+
+        return self.create_build(source.source_blob['get_url'], version)
+
+    def deploy_directory(self, path, version=None, exclude=('.git',)):
+        """
+        Packs a directory into a .tar.gz on disk and deploys it, see deploy_tarball.
+
+        Files and directories named in exclude are left out, at any depth.
+        """
+        self._h._require_sync('App.deploy_directory')
+        exclude = frozenset(exclude or ())
+
+        def skip(info):
+            return None if os.path.basename(info.name) in exclude else info
+
+        with tempfile.TemporaryFile() as archive:
+            with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+                for name in sorted(os.listdir(path)):
+                    if name not in exclude:
+                        tar.add(os.path.join(path, name), arcname=name, filter=skip)
+            archive.seek(0)
+
+            return self.deploy_tarball(archive, version)
 
     def delete(self):
         """
         Destroys the current app
         """
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.id)
         )
-        r.raise_for_status()
-        return r.ok
 
     def add_collaborator(self, user_id_or_email, silent=False):
         """
@@ -126,28 +174,23 @@ class App(BaseResource):
         #commented out until api is fixed
         payload = {'silent': silent, 'user': user_id_or_email}
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('apps', self.name, 'collaborators'),
-            data=self._h._resource_serialize(payload)
+            obj=Collaborator,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Collaborator.new_from_dict(item, h=self._h, app=self)
-
     def remove_collaborator(self, id_or_email):
         """
         Removes a collaborator from a project
         options = id_or_email
         """
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.name, 'collaborators', id_or_email)
         )
-        r.raise_for_status()
-
-        return r.ok
 
     def install_addon(self, plan_id_or_name, config=None):
 
@@ -158,26 +201,22 @@ class App(BaseResource):
         payload['plan'] = plan_id_or_name
         payload['config'] = config
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('apps', self.name, 'addons'),
-            data=self._h._resource_serialize(payload)
+            obj=Addon,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Addon.new_from_dict(item, h=self._h, app=self)
-
     def remove_addon(self, id):
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='DELETE',
             resource=('apps', self.id, 'addons', id),
+            obj=Addon,
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Addon.new_from_dict(item, h=self._h, app=self)
-
     def collaborators(self, **kwargs):
         """The collaborators for this app."""
         return self._h._get_resources(
@@ -195,16 +234,14 @@ class App(BaseResource):
 
     def update_config(self, config):
         payload = self._h._resource_serialize(config)
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.id, 'config-vars'),
-            data=payload
+            obj=ConfigVars,
+            data=payload,
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return ConfigVars.new_from_dict(item, h=self._h, app=self)
-
     def domains(self, **kwargs):
         """The domains for this app."""
         return self._h._get_resources(
@@ -214,26 +251,20 @@ class App(BaseResource):
 
     def add_domain(self, hostname):
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('apps', self.name, 'domains'),
-            data=self._h._resource_serialize({'hostname': hostname})
+            obj=Domain,
+            data=self._h._resource_serialize({'hostname': hostname}),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return Domain.new_from_dict(item, h=self._h, app=self)
-
     def remove_domain(self, hostname):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.name, 'domains', hostname)
         )
 
-        r.raise_for_status()
-
-        return r.ok
-
     def dynos(self, **kwargs):
         """The proccesses for this app."""
         return self._h._get_resources(
@@ -248,49 +279,73 @@ class App(BaseResource):
         )
 
     def kill_dyno(self, dyno_id_or_name):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.id, 'dynos', quote(dyno_id_or_name))
         )
 
-        r.raise_for_status()
+    def restart(self, concurrency=1, rolling=None, interval=0, progress=None):
+        """Restarts the app's dynos, except one-off 'run' dynos.
 
-        return r.ok
+        Up to *concurrency* dynos are killed at a time. With rolling=N,
+        dynos are restarted in waves of at most N of each process type,
+        *interval* seconds apart. progress(dyno, result) is called, from a
+        worker thread, as each kill completes.
 
-    def restart(self):
-        for dyno in self.dynos():
-            if dyno.type != 'run':
-                dyno.kill()
-        return self
+        Returns {dyno name: True, or the exception its kill raised}.
+        """
+        self._h._require_sync('App.restart')
+        dynos = [dyno for dyno in self.dynos() if dyno.type != 'run']
+        waves = self._restart_waves(dynos, rolling) if rolling else [dynos]
+
+        results = {}
+        for (i, wave) in enumerate(waves):
+            if i and interval:
+                time.sleep(interval)
+            outcomes = self._h.gather([partial(self._restart_dyno, dyno, progress) for dyno in wave], workers=concurrency)
+            results.update(zip([dyno.name for dyno in wave], outcomes))
+
+        return results
+
+    @staticmethod
+    def _restart_waves(dynos, size):
+        """Splits dynos into waves holding at most size dynos of each process type."""
+        by_type = OrderedDict()
+        for dyno in dynos:
+            by_type.setdefault(dyno.type, []).append(dyno)
+
+        longest = max([len(group) for group in by_type.values()] or [0])
+        return [[dyno for group in by_type.values() for dyno in group[i:i + size]] for i in range(0, longest, size)]
+
+    @staticmethod
+    def _restart_dyno(dyno, progress):
+        try:
+            result = dyno.kill()
+        except Exception as e:
+            result = e
+
+        if progress is not None:
+            progress(dyno, result)
+
+        return result
+
+    def restart_all(self):
+        """Restarts all of the app's dynos, one-off dynos included, with a single request."""
+        return self._h._request_ok(
+            method='DELETE',
+            resource=('apps', self.id, 'dynos')
+        )
 
     def run_command_detached(self, command, size=1, env=None):
         """Run a remote command but do not wait for the command to complete"""
         return self.run_command(command, attach=False, printout=False, size=size, env=env)
 
-    def run_command(self, command, attach=True, printout=True, size=1, env=None):
-        """Run a remote command attach=True if you want to capture the output"""
-        if attach:
-            attach = True
+    def run_command(self, command, attach=True, printout=True, size=1, env=None, stream=False):
+        """Run a remote command attach=True if you want to capture the output
 
-        payload = {'command': command, 'attach': attach, 'size': size}
-        if env:
-            payload['env'] = env
-
-        r = self._h._http_resource(
-            method='POST',
-            resource=('apps', self.name, 'dynos'),
-            data=self._h._resource_serialize(payload)
-        )
-
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        dyno = Dyno.new_from_dict(item, h=self._h, app=self)
-
-        if attach:
-            output = Rendezvous(dyno.attach_url, printout).start()
-            return output, dyno
-        else:
-            return dyno
+        With stream=True, returns the unstarted Rendezvous instead of the output.
+        """
+        return self._h._run_command(self.name, command, size=size, attach=attach, printout=printout, env=env, stream=stream, app=self)
 
     def process_formation(self, **kwargs):
         """The formation processes for this app."""
@@ -299,34 +354,48 @@ class App(BaseResource):
             obj=Formation, app=self, **kwargs
         )
 
+    def update_formation(self, updates):
+        """Scales and resizes several process types with a single request.
+
+        updates maps process types to a quantity, or to a dict with a
+        quantity and/or a size::
+
+            app.update_formation({'web': 4, 'worker': {'quantity': 2, 'size': 'standard-2X'}})
+
+        Returns the updated formation processes.
+        """
+        return self._h._request_items(
+            method='PATCH',
+            resource=('apps', self.id, 'formation'),
+            obj=Formation,
+            data=self._h._resource_serialize({'updates': formation_updates(updates)}),
+            app=self
+        )
+
     def scale_formation_process(self, formation_id_or_name, quantity):
         assert(quantity == 0 or quantity)
         payload = {}
         payload['quantity'] = quantity
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.id, 'formation', formation_id_or_name),
+            obj=Formation,
             data=self._h._resource_serialize(payload)
         )
 
-        r.raise_for_status()
-        return self._h._process_item(self._h._resource_deserialize(r.content.decode("utf-8")), Formation)
-
     def resize_formation_process(self, formation_id_or_name, size):
         assert(size == 0 or size)
         payload = {}
         payload['size'] = size
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.id, 'formation', formation_id_or_name),
+            obj=Formation,
             data=self._h._resource_serialize(payload)
         )
 
-        r.raise_for_status()
-        return self._h._process_items(self._h._resource_deserialize(r.content.decode("utf-8")), Formation)
-
     @property
     def info(self):
         """Returns current info for this app."""
@@ -354,16 +423,14 @@ class App(BaseResource):
     def update_feature(self, id_or_name, enabled):
 
         payload = {'enabled': enabled}
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.id, 'features', id_or_name),
-            data=self._h._resource_serialize(payload)
+            obj=AppFeature,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return AppFeature.new_from_dict(item, h=self._h, app=self)
-
     def logdrains(self, **kwargs):
         return self._h._get_resources(
             resource=('apps', self.id, 'log-drains'),
@@ -372,27 +439,23 @@ class App(BaseResource):
 
     def create_logdrain(self, url):
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='POST',
             resource=('apps', self.id, 'log-drains'),
-            data=self._h._resource_serialize({'url': url})
+            obj=LogDrain,
+            data=self._h._resource_serialize({'url': url}),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return LogDrain.new_from_dict(item, h=self._h, app=self)
-
     def remove_logdrain(self, id_or_url):
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='DELETE',
             resource=('apps', self.id, 'log-drains', id_or_url),
+            obj=LogDrain,
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return LogDrain.new_from_dict(item, h=self._h, app=self)
-
     def rename(self, name):
         """Renames app to given name."""
 
@@ -409,26 +472,22 @@ class App(BaseResource):
 
         payload = {'app': self.id, 'recipient': recipient_id_or_name}
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PUT',
             resource=('account', 'app-transfers'),
-            data=self._h._resource_serialize(payload)
+            obj=AppTransfer,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return AppTransfer.new_from_dict(item, h=self._h, app=self)
-
     def delete_transfer(self, id):
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='DELETE',
             resource=('account', 'app-transfers', id),
+            obj=AppTransfer,
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return AppTransfer.new_from_dict(item, h=self._h, app=self)
-
     def enable_maintenance_mode(self):
         """Enables maintenance mode."""
         return self.update(maintenance=True)
@@ -448,55 +507,23 @@ class App(BaseResource):
             if maintenance or maintenance == 0:
                 payload['maintenance'] = maintenance
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.id),
-            data=self._h._resource_serialize(payload)
+            obj=App,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return App.new_from_dict(item, h=self._h, app=self)
-
     def destroy(self):
         """Destoys the app. Do be careful."""
         return self.delete()
 
-    def stream_log(self, dyno=None, lines=100, source=None, timeout=False):
-        logger = self._logger(dyno=dyno, lines=lines, source=source, tail=True)
-
-        return logger.stream(timeout=timeout)
-
-    def get_log(self, dyno=None, lines=100, source=None, timeout=False):
-        logger = self._logger(dyno=dyno, lines=lines, source=source, tail=0)
-
-        return logger.get(timeout=timeout)
-
-    def _logger(self, dyno=None, lines=100, source=None, tail=0):
-
-        payload = {}
-        if dyno:
-            payload['dyno'] = dyno
-
-        if tail:
-            payload['tail'] = tail
-
-        if source:
-            payload['source'] = source
-
-        if lines:
-            payload['lines'] = lines
-
-        r = self._h._http_resource(
-            method='POST',
-            resource=('apps', self.id, 'log-sessions'),
-            data=self._h._resource_serialize(payload)
-        )
-
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
+    def stream_log(self, dyno=None, lines=100, source=None, timeout=False, parse=False):
+        return self._h.stream_app_log(self.id, dyno=dyno, lines=lines, source=source, timeout=timeout, parse=parse)
 
-        return LogSession.new_from_dict(item, h=self._h, app=self)
+    def get_log(self, dyno=None, lines=100, source=None, timeout=False, parse=False):
+        return self._h.get_app_log(self.id, dyno=dyno, lines=lines, source=source, timeout=timeout, parse=parse)
 
     def releases(self, **kwargs):
         """The releases for this app."""
@@ -523,17 +550,15 @@ class App(BaseResource):
         payload = {
             'slug': slug_id,
         }
-        r = self._h._http_resource(
+        return self._h._request_data(
             method='POST',
             resource=('apps', self.name, 'releases'),
             data=self._h._resource_serialize(payload)
         )
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return item
 
     def rollback(self, release):
         """Rolls back the release to the given version."""
+        self._h._require_sync('App.rollback')
         r = self._h._http_resource(
             method='POST',
             resource=('apps', self.name, 'releases'),
@@ -562,25 +587,22 @@ class AppTransfer(BaseResource):
         payload = {}
         payload['state'] = state
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('account', 'app-transfers', self.id),
-            data=self._h._resource_serialize(payload)
+            obj=AppTransfer,
+            data=self._h._resource_serialize(payload),
+            app=self
         )
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return AppTransfer.new_from_dict(item, h=self._h, app=self)
 
     def delete(self):
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='DELETE',
             resource=('account', 'app-transfers', self.id),
+            obj=AppTransfer,
+            app=self
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return AppTransfer.new_from_dict(item, h=self._h, app=self)
-
 
 class AppFeature(BaseResource):
     _strs = ['name', 'description', 'doc_url', 'id']
@@ -596,13 +618,11 @@ class AppFeature(BaseResource):
         return "<app_feature '{0}'>".format(self.name)
 
     def update(self, enabled):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='POST',
             resource=('apps', self.app.id, 'features', self.id),
             data=self._h._resource_serialize({'enabled': enabled})
         )
-        r.raise_for_status()
-        return r.ok
 
     def enable(self):
         return self.update(True)
@@ -1,12 +1,13 @@
 from . import BaseResource
 from . import User
 from .buildpack import Buildpack
-from .buildresult import BuildResult
+from .buildresult import BuildResult, BUILD_TERMINAL_STATUSES
 
 class Build(BaseResource):
     _dates = ['created_at','updated_at']
     _strs  = ['id','status']
     _pks   = ['id']
+    _immutable = True
     _map   = {'user' : User }
     _arrays = { 'buildpacks' : Buildpack }
 
@@ -16,6 +17,10 @@ class Build(BaseResource):
     def __repr__(self):
         return "<build '{0} - {1}'>".format(self.id, self.status)
 
+    @classmethod
+    def is_immutable(cls, d):
+        return d.get('status') in BUILD_TERMINAL_STATUSES
+
     def result(self, **kwargs):
         return self._h._get_resource(
             resource=('apps', self.app.name, 'builds', self.id, 'result'),
@@ -1,8 +1,15 @@
 from . import BaseResource
 from .line import Line
 
+BUILD_TERMINAL_STATUSES = frozenset(['succeeded', 'failed'])
+
 class BuildResult(BaseResource):
     _arrays = { 'lines': Line }
+    _immutable = True
 
     def __repr__(self):
         return "<buildresult>"
+
+    @classmethod
+    def is_immutable(cls, d):
+        return (d.get('build') or {}).get('status') in BUILD_TERMINAL_STATUSES
@@ -18,10 +18,7 @@ class Collaborator(BaseResource):
         return "<collaborator '{0}'>".format(self.user.email)
 
     def remove(self):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.app.name, 'collaborators', self.user.email)
         )
-        r.raise_for_status()
-
-        return r.ok
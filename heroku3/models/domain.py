@@ -17,11 +17,7 @@ class Domain(BaseResource):
         return "<domain '{0}'>".format(self.hostname)
 
     def remove(self):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.app.name, 'domains', self.hostname)
         )
-
-        r.raise_for_status()
-
-        return r.ok
@@ -22,15 +22,11 @@ class Dyno(BaseResource):
         return "<Dyno '{0} - {1}'>".format(self.name, self.command)
 
     def kill(self):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.app.id, 'dynos', self.id)
         )
 
-        r.raise_for_status()
-
-        return r.ok
-
     def restart(self):
         if self.type == 'run':
             raise RestartRunException("Unable to restart a Process of type 'run' as it will not be respawned by Heroku")
@@ -8,6 +8,29 @@ else:
     from urllib import quote # noqa
 
 
+def formation_updates(updates):
+    """Returns the updates array of a bulk formation PATCH.
+
+    updates maps process types to a quantity, or to a dict holding a
+    quantity and/or a size, e.g. {'web': 4, 'worker': {'size': 'standard-2X'}}.
+    A list of such dicts with a 'type' key is passed through.
+    """
+    if not isinstance(updates, dict):
+        return list(updates)
+
+    payload = []
+    for (type, change) in updates.items():
+        if not isinstance(change, dict):
+            change = {'quantity': change}
+
+        assert(change.get('size') or change.get('quantity') == 0 or change.get('quantity'))
+        update = {'type': type}
+        update.update((k, v) for (k, v) in change.items() if v is not None)
+        payload.append(update)
+
+    return payload
+
+
 class Formation(BaseResource):
 
     _strs = ['id', 'command', 'type', 'size']
@@ -41,11 +64,9 @@ class Formation(BaseResource):
         if quantity or quantity == 0:
             payload['quantity'] = quantity
 
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('apps', self.app.id, 'formation', quote(self.type)),
+            obj=Formation,
             data=self._h._resource_serialize(payload)
         )
-
-        r.raise_for_status()
-        return self._h._process_item(self._h._resource_deserialize(r.content.decode("utf-8")), Formation)
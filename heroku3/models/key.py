@@ -16,6 +16,7 @@ class Key(BaseResource):
 
     def delete(self):
         """Deletes the key."""
+        self._h._require_sync('Key.delete')
         r = self._h._http_resource(
             method='DELETE',
             resource=('account', 'keys', self.id)
@@ -16,11 +16,7 @@ class LogDrain(BaseResource):
         return "<logdrain '{0}'>".format(self.id)
 
     def remove(self):
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('apps', self.app.id, 'log-drains', self.id)
         )
-
-        r.raise_for_status()
-
-        return r.ok
@@ -1,5 +1,36 @@
 from .  import BaseResource
-import requests
+from ..helpers import parse_date
+from collections import namedtuple
+
+
+class LogLine(namedtuple('LogLine', ['timestamp', 'source', 'dyno', 'message'])):
+    """One logplex line, e.g. ``2012-01-01T12:00:00.000000+00:00 app[web.1]: message``.
+
+    The timestamp is kept as sent, see the datetime property.
+    """
+    __slots__ = ()
+
+    @property
+    def datetime(self):
+        return parse_date(self.timestamp) if self.timestamp else None
+
+
+def parse_logline(line):
+    """Splits a logplex line, str or bytes, into a LogLine.
+
+    Lines not in the logplex format are returned whole as the message.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', 'replace')
+
+    timestamp, _, rest = line.partition(' ')
+    process, sep, message = rest.partition(': ')
+    if not sep or not process.endswith(']'):
+        return LogLine(None, None, None, line)
+
+    source, _, dyno = process[:-1].partition('[')
+
+    return LogLine(timestamp, source, dyno, message)
 
 
 class LogSession(BaseResource):
@@ -16,10 +47,22 @@ class LogSession(BaseResource):
     def __repr__(self):
         return "<logsession '{0}'>".format(self.id)
 
-    def stream(self, timeout=False):
-        r = requests.get(self.logplex_url, verify=False, stream=True, timeout=timeout)
-        return r.iter_lines()
+    def _get(self, timeout):
+        # Logplex is another host, it shares the client's pools but not its credentials.
+        r = self._h._external_request('GET', self.logplex_url, stream=True, timeout=timeout or None)
+        r.raise_for_status()
+        return r
+
+    def stream(self, timeout=False, parse=False):
+        """Yields log lines as bytes as they arrive, or LogLines with parse=True."""
+        lines = self._get(timeout).iter_lines()
+        if not parse:
+            return lines
+        return (parse_logline(line) for line in lines if line)
 
-    def get(self, timeout=False):
-        r = requests.get(self.logplex_url, verify=False, stream=True, timeout=timeout)
-        return r.content.decode("utf-8")
+    def get(self, timeout=False, parse=False):
+        """Returns the log as a str, or a list of LogLines with parse=True."""
+        content = self._get(timeout).content.decode("utf-8")
+        if not parse:
+            return content
+        return [parse_logline(line) for line in content.splitlines() if line]
@@ -79,27 +79,22 @@ class OAuthClient(BaseResource):
         """
         Destroys the current OAuthClient
         """
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('oauth', 'clients', self.id)
         )
-        r.raise_for_status()
-        return r.ok
 
     def update(self, name=None, redirect_uri=None):
 
         assert (name or redirect_uri)
         payload = {'name': name, 'redirect_uri': redirect_uri}
-        r = self._h._http_resource(
+        return self._h._request_item(
             method='PATCH',
             resource=('oauth', 'clients', self.id),
+            obj=OAuthClient,
             data=self._h._resource_serialize(payload)
         )
 
-        r.raise_for_status()
-        item = self._h._resource_deserialize(r.content.decode("utf-8"))
-        return OAuthClient.new_from_dict(item, h=self._h)
-
 
 class OAuthAuthorization(BaseResource):
     _strs = ['id']
@@ -119,12 +114,10 @@ class OAuthAuthorization(BaseResource):
         """
         Destroys the current OAuthAuthorization
         """
-        r = self._h._http_resource(
+        return self._h._request_ok(
             method='DELETE',
             resource=('oauth', 'authorizations', self.id)
         )
-        r.raise_for_status()
-        return r.ok
 
 
 class OAuthToken(BaseResource):
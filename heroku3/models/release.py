@@ -9,8 +9,14 @@ class Release(BaseResource):
     _dicts = ['slug']
     _map = {'user': User}
     _pks = ['id', 'version']
+    _immutable = True
     order_by = 'version'
 
+    @classmethod
+    def is_immutable(cls, d):
+        # A release is settled once its release phase is over.
+        return d.get('status') != 'pending'
+
     def __init__(self):
         self.app = None
         super(Release, self).__init__()
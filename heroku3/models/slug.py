@@ -8,6 +8,7 @@ class Slug(BaseResource):
     _dicts = ['blob']
     _map = {}
     _pks = ['id']
+    # Not cached on disk, blob holds a download URL which expires.
     order_by = 'created_at'
 
     def __init__(self):
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.ratelimit
+~~~~~~~~~~~~~~~~
+
+This module contains the client side request pacing for the Heroku API.
+"""
+
+import threading
+import time
+
+
+#: Heroku grants 4500 requests per account, refilled continuously over an hour.
+HEROKU_RATELIMIT_CAPACITY = 4500
+HEROKU_RATELIMIT_REFILL = HEROKU_RATELIMIT_CAPACITY / 3600.0
+
+
+class TokenBucket(object):
+    """Token bucket that mirrors Heroku's request budget.
+
+    Each request takes a token. When the bucket runs dry, :meth:`reserve`
+    tells the caller how long to wait for its token instead of letting the
+    API answer with a 429, so concurrent callers queue up in order.
+    The server's ``ratelimit-remaining`` header is fed back through
+    :meth:`update` to keep the estimate honest.
+    """
+
+    def __init__(self, capacity=HEROKU_RATELIMIT_CAPACITY, rate=HEROKU_RATELIMIT_REFILL, clock=time.monotonic):
+        super(TokenBucket, self).__init__()
+
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<token-bucket {0}/{1}>'.format(self.remaining, self.capacity)
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def remaining(self):
+        """The number of requests that can be sent right now without waiting."""
+        with self._lock:
+            self._refill()
+            return max(0, int(self._tokens))
+
+    def reserve(self, tokens=1):
+        """Takes tokens from the bucket, returning the seconds to wait before using them."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def update(self, remaining):
+        """Aligns the bucket with the budget reported by Heroku."""
+        with self._lock:
+            self._refill()
+            # Other clients may share the account, so only ever lower the estimate.
+            self._tokens = min(self._tokens, float(remaining))
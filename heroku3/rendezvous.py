@@ -1,67 +1,398 @@
-import six
+import asyncio
+import errno
 import socket
 import select
+import selectors
 import ssl
 import os
+import sys
+import tempfile
+import time
 #from pprint import pprint
 from urllib.parse import urlparse, uses_netloc
 uses_netloc.append('rendezvous')
 
 
+#: Bytes asked of the socket per read.
+DEFAULT_RECV_SIZE = 64 * 1024
+
+
 class InvalidResponseFromRendezVous(Exception):
     pass
 
 
 class Rendezvous():
-    def __init__(self, url, printout=False):
+    """Session attached to the output of a one-off dyno.
+
+    Output can be consumed as it arrives, with :meth:`iter_chunks`,
+    :meth:`iter_lines` or an *on_data* callback, or collected by
+    :meth:`start`, in memory or, with *spool* set, in a temporary file
+    which moves to disk beyond that many bytes.
+    """
+
+    def __init__(self, url, printout=False, recv_size=DEFAULT_RECV_SIZE, on_data=None, spool=None, timeout=20):
         self.url = url
         urlp = urlparse(url)
         self.hostname = urlp.hostname
         self.port = urlp.port
-        self.secret = urlp.path[1:]
-        if six.PY3:
-            self.secret = str.encode(self.secret)
+        self.secret = str.encode(urlp.path[1:])
         path = os.path.dirname(os.path.realpath(__file__))
         self.cert = os.path.abspath("{0}/data/cacert.pem".format(path))
-        self.data = six.b("")
+        self.data = b""
         self.printout = printout
+        self.recv_size = recv_size
+        self.on_data = on_data
+        self.spool = spool
+        self.timeout = timeout
+        self._greeting_rest = b""
 
-    def start(self):
+    def _connect(self):
+        """Opens the TLS connection and performs the secret handshake, returning the socket."""
 
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
         # Require a certificate from the server. We used a self-signed certificate
         # so here ca_certs must be the server certificate itself.
 
-        ssl_sock = ssl.wrap_socket(s,
-                            ca_certs=self.cert,
-                            cert_reqs=ssl.CERT_REQUIRED,
-                            ssl_version=ssl.PROTOCOL_TLSv1)
+        ssl_sock = self.ssl_context().wrap_socket(s)
 
-        ssl_sock.settimeout(20)
+        ssl_sock.settimeout(self.timeout)
         ssl_sock.connect((self.hostname, self.port))
         ssl_sock.write(self.secret)
         data = ssl_sock.read()
-        # if six.PY3:
-        #     import pdb; pdb.set_trace()
-        #     if isinstance(data, str):
-        #         data = str.encode(data)
-        if not data.startswith(six.b("rendezvous")):
+        if not data.startswith(b"rendezvous"):
+            ssl_sock.close()
             raise InvalidResponseFromRendezVous("The Response from the rendezvous server wasn't as expected. Response was - {0}".format(data))
-        while True:
-            r, w, e = select.select([ssl_sock], [], [])
-            if ssl_sock in r:
+
+        # Output may arrive in the same record as the greeting.
+        self._greeting_rest = data.partition(b'\n')[2]
+        return ssl_sock
+
+    def iter_chunks(self):
+        """Yields the dyno's output as it arrives, in chunks of up to recv_size bytes."""
+        ssl_sock = self._connect()
+        try:
+            if self._greeting_rest:
+                self._deliver(self._greeting_rest)
+                yield self._greeting_rest
+            while True:
+                # Decrypted bytes can wait in the SSL buffer while the socket looks idle.
+                if not ssl_sock.pending():
+                    select.select([ssl_sock], [], [])
                 try:
-                    data = ssl_sock.recv(1024)
-                except ssl.SSLError as e:
-                    # Ignore the SSL equivalent of EWOULDBLOCK, but re-raise other errors
-                    if e.errno != ssl.SSL_ERROR_WANT_READ:
-                        raise e
+                    data = ssl_sock.recv(self.recv_size)
+                except ssl.SSLWantReadError:
+                    # The SSL equivalent of EWOULDBLOCK.
                     continue
                 # No data means end of file
                 if not data:
                     break
-                if self.printout:
-                    print(data.rstrip('\n'))
-                self.data += data
+                self._deliver(data)
+                yield data
+        finally:
+            ssl_sock.close()
+
+    def _deliver(self, data):
+        if self.printout:
+            sys.stdout.write(data.decode('utf-8', 'replace'))
+            sys.stdout.flush()
+        if self.on_data is not None:
+            self.on_data(data)
+
+    def ssl_context(self):
+        """Returns a client SSLContext trusting only the bundled rendezvous certificate."""
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        # The certificate is self-signed and not issued for the dyno hosts.
+        context.check_hostname = False
+        context.load_verify_locations(self.cert)
+        return context
+
+    def _open_output(self):
+        if self.spool is not None:
+            return tempfile.SpooledTemporaryFile(max_size=self.spool)
+        return bytearray()
+
+    def _close_output(self, output):
+        if self.spool is not None:
+            output.seek(0)
+            return output
+        self.data = bytes(output)
         return self.data
+
+    def iter_lines(self, keepends=False, encoding='utf-8'):
+        """Yields the dyno's output line by line, decoded unless encoding is None."""
+        buf = bytearray()
+        for data in self.iter_chunks():
+            buf += data
+            start = 0
+            while True:
+                end = buf.find(b'\n', start)
+                if end < 0:
+                    break
+                yield self._line(buf[start:end + 1 if keepends else end], encoding)
+                start = end + 1
+            del buf[:start]
+
+        if buf:
+            yield self._line(buf, encoding)
+
+    @staticmethod
+    def _line(buf, encoding):
+        if encoding is None:
+            return bytes(buf)
+        return buf.decode(encoding, 'replace')
+
+    def start(self):
+        """Waits for the dyno to exit and returns its output.
+
+        Returns bytes, or with spool set, the rewound temporary file.
+        """
+        output = self._open_output()
+        write = output.write if self.spool is not None else output.extend
+        for data in self.iter_chunks():
+            write(data)
+
+        return self._close_output(output)
+
+
+class AsyncRendezvous(Rendezvous):
+    """Rendezvous session over asyncio streams, for use from an event loop.
+
+    Takes the same arguments as Rendezvous, its iter_chunks and iter_lines
+    are async iterators and start a coroutine. The timeout bounds the
+    connection and handshake.
+    """
+
+    async def _connect(self):
+        """Opens the TLS connection and performs the secret handshake, returning the stream pair."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.hostname, self.port, ssl=self.ssl_context(), limit=self.recv_size),
+            self.timeout
+        )
+        try:
+            writer.write(self.secret)
+            # Streams coalesce records, the greeting may arrive along with output.
+            data = await asyncio.wait_for(reader.readline(), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        if not data.startswith(b"rendezvous"):
+            writer.close()
+            raise InvalidResponseFromRendezVous("The Response from the rendezvous server wasn't as expected. Response was - {0}".format(data))
+
+        return reader, writer
+
+    async def iter_chunks(self):
+        """Yields the dyno's output as it arrives, in chunks of up to recv_size bytes."""
+        reader, writer = await self._connect()
+        try:
+            while True:
+                data = await reader.read(self.recv_size)
+                # No data means end of file
+                if not data:
+                    break
+                self._deliver(data)
+                yield data
+        finally:
+            writer.close()
+
+    async def iter_lines(self, keepends=False, encoding='utf-8'):
+        """Yields the dyno's output line by line, decoded unless encoding is None."""
+        buf = bytearray()
+        async for data in self.iter_chunks():
+            buf += data
+            start = 0
+            while True:
+                end = buf.find(b'\n', start)
+                if end < 0:
+                    break
+                yield self._line(buf[start:end + 1 if keepends else end], encoding)
+                start = end + 1
+            del buf[:start]
+
+        if buf:
+            yield self._line(buf, encoding)
+
+    async def start(self):
+        """Waits for the dyno to exit and returns its output, see Rendezvous.start."""
+        output = self._open_output()
+        write = output.write if self.spool is not None else output.extend
+        async for data in self.iter_chunks():
+            write(data)
+
+        return self._close_output(output)
+
+
+class _Channel(object):
+    """Non-blocking state of one Rendezvous session in a RendezvousMultiplexer."""
+
+    def __init__(self, key, rendezvous, collect, on_data=None):
+        self.key = key
+        self.rendezvous = rendezvous
+        self.on_data = on_data
+        self.output = rendezvous._open_output() if collect else None
+        self.deadline = time.monotonic() + rendezvous.timeout if rendezvous.timeout else None
+        self.state = 'connect'
+        self.sent = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        err = self.sock.connect_ex((rendezvous.hostname, rendezvous.port))
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self.sock.close()
+            raise OSError(err, os.strerror(err))
+        self.events = selectors.EVENT_WRITE
+
+    def step(self, selector):
+        """Advances the session as far as the socket allows, returning True once the output has ended."""
+        if self.state == 'connect':
+            err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise OSError(err, os.strerror(err))
+            # Wrapping moves the descriptor to a new socket object.
+            selector.unregister(self.sock)
+            self.sock = self.rendezvous.ssl_context().wrap_socket(self.sock, do_handshake_on_connect=False)
+            selector.register(self.sock, self.events, self)
+            self.state = 'handshake'
+
+        if self.state == 'handshake':
+            try:
+                self.sock.do_handshake()
+            except ssl.SSLWantReadError:
+                return self._want(selector, selectors.EVENT_READ)
+            except ssl.SSLWantWriteError:
+                return self._want(selector, selectors.EVENT_WRITE)
+            self.state = 'secret'
+
+        if self.state == 'secret':
+            secret = self.rendezvous.secret
+            while self.sent < len(secret):
+                try:
+                    self.sent += self.sock.send(secret[self.sent:])
+                except ssl.SSLWantWriteError:
+                    return self._want(selector, selectors.EVENT_WRITE)
+                except ssl.SSLWantReadError:
+                    return self._want(selector, selectors.EVENT_READ)
+            self.state = 'banner'
+            self._want(selector, selectors.EVENT_READ)
+
+        if self.state == 'banner':
+            try:
+                data = self.sock.recv(self.rendezvous.recv_size)
+            except ssl.SSLWantReadError:
+                return False
+            if not data.startswith(b"rendezvous"):
+                raise InvalidResponseFromRendezVous("The Response from the rendezvous server wasn't as expected. Response was - {0}".format(data))
+            self.state = 'stream'
+            self.deadline = None
+            # Output may arrive in the same record as the greeting.
+            rest = data.partition(b'\n')[2]
+            if rest:
+                self._receive(rest)
+
+        # Drain everything readable, including records already decrypted into the SSL buffer.
+        while True:
+            try:
+                data = self.sock.recv(self.rendezvous.recv_size)
+            except ssl.SSLWantReadError:
+                return False
+            if not data:
+                return True
+            self._receive(data)
+
+    def _receive(self, data):
+        self.rendezvous._deliver(data)
+        if self.output is not None:
+            if self.rendezvous.spool is not None:
+                self.output.write(data)
+            else:
+                self.output.extend(data)
+        if self.on_data is not None:
+            self.on_data(self.key, data)
+
+    def _want(self, selector, events):
+        if events != self.events:
+            self.events = events
+            selector.modify(self.sock, events, self)
+        return False
+
+    def result(self):
+        if self.output is None:
+            return None
+        return self.rendezvous._close_output(self.output)
+
+    def close(self):
+        self.sock.close()
+
+
+class RendezvousMultiplexer(object):
+    """Attaches to many one-off dynos at once from a single thread.
+
+    Sessions are added under a key, typically the app or dyno, and driven
+    by one selector loop through the TLS handshake, the secret exchange
+    and their output. Each session's printout and on_data settings apply
+    as with Rendezvous.start, and *on_data* is called with (key, chunk) for
+    every chunk of every session.
+
+    :meth:`run` yields (key, result) as each session ends, the result being
+    the session's output (see Rendezvous.start), None when collect is
+    False, or the exception which ended it. Connection and handshake are
+    bounded by each session's timeout, the output is read until the dyno
+    exits.
+    """
+
+    def __init__(self, on_data=None, collect=True):
+        self.on_data = on_data
+        self.collect = collect
+        self._pending = []
+
+    def add(self, key, rendezvous):
+        self._pending.append((key, rendezvous))
+        return rendezvous
+
+    def __len__(self):
+        return len(self._pending)
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        channels = set()
+
+        def finish(channel, result):
+            selector.unregister(channel.sock)
+            channel.close()
+            channels.discard(channel)
+            return channel.key, result
+
+        try:
+            pending, self._pending = self._pending, []
+            for (key, rendezvous) in pending:
+                try:
+                    channel = _Channel(key, rendezvous, self.collect, self.on_data)
+                except Exception as e:
+                    yield key, e
+                    continue
+                channels.add(channel)
+                selector.register(channel.sock, channel.events, channel)
+
+            while channels:
+                deadlines = [c.deadline for c in channels if c.deadline is not None]
+                timeout = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+
+                for (selector_key, _) in selector.select(timeout):
+                    channel = selector_key.data
+                    try:
+                        done = channel.step(selector)
+                    except Exception as e:
+                        yield finish(channel, e)
+                        continue
+                    if done:
+                        yield finish(channel, channel.result())
+
+                now = time.monotonic()
+                for channel in list(channels):
+                    if channel.deadline is not None and channel.deadline <= now:
+                        yield finish(channel, socket.timeout('Timed out attaching to {0}'.format(channel.rendezvous.hostname)))
+        finally:
+            for channel in channels:
+                channel.close()
+            selector.close()
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.replay
+~~~~~~~~~~~~~
+
+This module contains sessions which record API traffic to a file and
+replay it later without network access::
+
+    session = RecordingSession('run.jsonl.gz')
+    heroku_conn = heroku3.from_key('YOUR_API_KEY', session=session)
+    ...
+    session.close()
+
+    heroku_conn = heroku3.from_key('-', session=ReplaySession('run.jsonl.gz'))
+"""
+
+from collections import deque
+from datetime import timedelta
+from urllib.parse import urlsplit
+import base64
+import gzip
+import json
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+FORMAT = 'heroku3-replay'
+VERSION = 1
+
+# Credentials never make it into a recording.
+_PRIVATE_HEADERS = frozenset(['authorization', 'cookie', 'set-cookie'])
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _public_headers(headers):
+    return dict((k, v) for (k, v) in headers.items() if k.lower() not in _PRIVATE_HEADERS)
+
+
+def _request_key(method, url, headers):
+    """Recorded exchanges are matched on method, path, query and Range, not on the host."""
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+
+    return (method.upper(), path, headers.get('Range'))
+
+
+class _TeeRaw(object):
+    """Wraps a streamed urllib3 response, passing the body read from it to on_done once it ends or is closed."""
+
+    def __init__(self, raw, on_done):
+        self._raw = raw
+        self._on_done = on_done
+        self._chunks = []
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._chunks.append(chunk)
+            yield chunk
+        self._done()
+
+    def read(self, amt=None, *args, **kwargs):
+        data = self._raw.read(amt, *args, **kwargs)
+        self._chunks.append(data)
+        if amt is None or not data:
+            self._done()
+        return data
+
+    def close(self):
+        self._raw.close()
+        self._done()
+
+    def _done(self):
+        if self._on_done is not None:
+            on_done, self._on_done = self._on_done, None
+            on_done(b''.join(self._chunks))
+
+
+class RecordingSession(requests.Session):
+    """requests Session which appends every exchange to a gzipped JSON lines file.
+
+    Each line holds the request method, URL and headers (without
+    credentials), the response status, headers and body, and its timings:
+    *elapsed* up to the response headers and *total* including the body.
+    A streamed response is written once its body ends or it is closed,
+    with the part that was read.
+    """
+
+    def __init__(self, path):
+        super(RecordingSession, self).__init__()
+
+        self.path = path
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._write({'format': FORMAT, 'version': VERSION, 'recorded_at': time.time()})
+
+    def __repr__(self):
+        return '<recording-session {0}>'.format(self.path)
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        r = super(RecordingSession, self).send(request, **kwargs)
+
+        entry = {
+            'method': request.method,
+            'url': request.url,
+            'request_headers': _public_headers(request.headers),
+            'status': r.status_code,
+            'reason': r.reason,
+            'headers': _public_headers(r.headers),
+            'elapsed': r.elapsed.total_seconds(),
+        }
+
+        if kwargs.get('stream'):
+            # Streamed bodies, such as log tails, may never end: record what was read once it's done.
+            r.raw = _TeeRaw(r.raw, lambda content: self._record(entry, content, started))
+        else:
+            self._record(entry, r.content, started)
+
+        return r
+
+    def _record(self, entry, content, started):
+        entry['total'] = time.perf_counter() - started
+
+        try:
+            entry['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(content).decode('ascii')
+
+        self._write(entry)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        super(RecordingSession, self).close()
+
+
+class ReplaySession(requests.Session):
+    """requests Session which answers requests from a RecordingSession file.
+
+    Requests are matched on method, path, query and Range header. Repeated
+    requests get the recorded responses in order, the last one once they
+    run out. With *speed* set, each response is delayed by its recorded
+    total time divided by speed, 1.0 replaying in real time. A request
+    that was never recorded raises ReplayError.
+    """
+
+    def __init__(self, path, speed=None):
+        super(ReplaySession, self).__init__()
+
+        self.path = path
+        self.speed = speed
+        self._exchanges = {}
+        self._lock = threading.Lock()
+        self._load(path)
+
+    def __repr__(self):
+        return '<replay-session {0}>'.format(self.path)
+
+    def _load(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != FORMAT or header.get('version') != VERSION:
+                raise ReplayError('{0} is not a heroku3 recording'.format(path))
+
+            for line in f:
+                entry = json.loads(line)
+                key = _request_key(entry['method'], entry['url'], entry['request_headers'])
+                self._exchanges.setdefault(key, deque()).append(entry)
+
+    def _next_entry(self, key):
+        with self._lock:
+            entries = self._exchanges.get(key)
+            if not entries:
+                raise ReplayError('No recorded response for {0} {1} (Range: {2})'.format(*key))
+            if len(entries) > 1:
+                return entries.popleft()
+            return entries[0]
+
+    def send(self, request, **kwargs):
+        entry = self._next_entry(_request_key(request.method, request.url, request.headers))
+
+        if self.speed:
+            time.sleep(entry['total'] / self.speed)
+
+        r = requests.Response()
+        r.status_code = entry['status']
+        r.reason = entry['reason']
+        r.headers = CaseInsensitiveDict(entry['headers'])
+        r.encoding = get_encoding_from_headers(r.headers)
+        r.url = request.url
+        r.request = request
+        r.elapsed = timedelta(seconds=entry['elapsed'])
+        r._content_consumed = True
+
+        if 'body_b64' in entry:
+            r._content = base64.b64decode(entry['body_b64'])
+        else:
+            r._content = entry['body'].encode('utf-8')
+
+        return r
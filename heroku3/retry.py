@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+heroku3.retry
+~~~~~~~~~~~~
+
+This module contains the retry policy for failed Heroku API requests.
+"""
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+
+
+class RetryPolicy(object):
+    """Decides whether, and after how long, a failed request is sent again.
+
+    Responses with a status in *statuses* and connection errors are retried
+    for idempotent *methods* only, since a POST may already have been acted
+    upon. A 429 is retried for every method, Heroku rejects those before
+    doing any work. The delay grows as ``backoff_factor * 2 ** attempt``,
+    capped at *max_backoff* and spread with full jitter, unless the server
+    sends a ``Retry-After`` header, which is capped at *max_backoff* too.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+    RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30, jitter=True, statuses=None, methods=None):
+        super(RetryPolicy, self).__init__()
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses) if statuses is not None else self.RETRY_STATUSES
+        self.methods = frozenset(m.upper() for m in methods) if methods is not None else self.IDEMPOTENT_METHODS
+
+    def __repr__(self):
+        return '<retry-policy max_retries={0}>'.format(self.max_retries)
+
+    def should_retry(self, method, attempt, status_code=None, error=None):
+        """Whether the request should be sent again after *attempt* retries."""
+        if attempt >= self.max_retries:
+            return False
+
+        if status_code == 429 and status_code in self.statuses:
+            return True
+
+        if method.upper() not in self.methods:
+            return False
+
+        if error is not None:
+            return True
+
+        return status_code in self.statuses
+
+    def backoff(self, attempt, retry_after=None):
+        """The number of seconds to wait before retry number *attempt* + 1."""
+        if retry_after is not None:
+            # A bad or hostile header mustn't park the caller for hours.
+            return min(retry_after, self.max_backoff)
+
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Returns the seconds given by a Retry-After header value, or None."""
+        if not value:
+            return None
+
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+
+        return max(0, (when - datetime.now(timezone.utc)).total_seconds())
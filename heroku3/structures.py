@@ -19,6 +19,11 @@ class KeyedListResource(object):
         self._obj = None
         self._kwargs = {}
 
+        # Maps every primary key value, raw and stringified, to its first item.
+        self._index = {}
+        for item in self._items:
+            self._index_item(item)
+
     def __repr__(self):
         return repr(self._items)
 
@@ -68,16 +73,28 @@ class KeyedListResource(object):
         if hasattr(self[0], 'delete'):
             return self[key].delete()
 
+    def _index_item(self, item):
+        for pk in item._ids:
+            try:
+                self._index.setdefault(pk, item)
+            except TypeError:
+                # Unhashable primary key values can only be found by scanning.
+                pass
+
     def get(self, key):
-        for item in self:
-            if key in item._ids:
-                return item
+        try:
+            return self._index.get(key)
+        except TypeError:
+            for item in self:
+                if key in item._ids:
+                    return item
 
     def __delitem__(self, key):
         self[key].delete()
 
     def append(self, items):
         self._items.append(items)
+        self._index_item(items)
 
     def change_connection(self, h):
         for item in self._items:
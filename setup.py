@@ -35,6 +35,10 @@ setup(
     package_data={'': ['LICENSE', ]},
     include_package_data=True,
     install_requires=required,
+    extras_require={
+        'async': ['aiohttp>=3.0'],
+        'speedups': ['orjson'],
+    },
     license='MIT',
     classifiers=(
         'Development Status :: 5 - Production/Stable',